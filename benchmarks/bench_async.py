@@ -0,0 +1,201 @@
+"""
+Benchmark del modo asincrono (src/asgi.py con uvicorn) frente al sincrono (src/wsgi.py
+con workers sync de gunicorn) con latencia de base de datos simulada.
+
+Cada sentencia SQL espera --latency-ms antes de ejecutarse, como si la base de datos
+estuviera en otra maquina: en gunicorn con time.sleep (el worker se queda bloqueado) y en
+uvicorn con asyncio.sleep (el event loop sigue atendiendo otras peticiones). Se lanzan las
+lecturas de asgi.py (favorito por id, consultas por lotes y rankings, sin cache) con
+varios niveles de concurrencia y se muestran req/s y latencias de cada modo.
+
+    python benchmarks/bench_async.py
+    python benchmarks/bench_async.py --latency-ms 50 --concurrency 1,50,200 --workers 4
+"""
+
+import argparse
+import asyncio
+import http.client
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SRC = os.path.join(ROOT, "src")
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "bench_async.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("CACHE_BACKEND", "memory")
+sys.path.insert(0, SRC)
+
+
+def seed(args):
+    from app import app
+    from models import db
+    from seed import seed_database
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(DB_PATH + suffix):
+            os.remove(DB_PATH + suffix)
+    with app.app_context():
+        db.create_all()
+        seed_database(args.users, args.pokemon, args.pokeballs, args.favoritos, seed=args.seed,
+                      log=lambda message: None)
+        db.session.remove()
+        db.engine.dispose()
+
+
+def serve_sync(args):
+    from gunicorn.app.base import BaseApplication
+    from sqlalchemy import event
+    from app import app
+    from models import db
+
+    latency = args.latency_ms / 1000
+
+    with app.app_context():
+        @event.listens_for(db.engine, "before_cursor_execute")
+        def simulated_latency(conn, cursor, statement, parameters, context, executemany):
+            time.sleep(latency)
+
+    class Server(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"127.0.0.1:{args.port}")
+            self.cfg.set("workers", args.workers)
+            self.cfg.set("loglevel", "warning")
+
+        def load(self):
+            return app
+
+    Server().run()
+
+
+def serve_async(args):
+    import uvicorn
+    from sqlalchemy import event
+    from sqlalchemy.util import await_only
+    from asgi import application, engine
+
+    latency = args.latency_ms / 1000
+
+    # los eventos del engine asincrono corren dentro de su greenlet: await_only cede el event loop
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def simulated_latency(conn, cursor, statement, parameters, context, executemany):
+        await_only(asyncio.sleep(latency))
+
+    uvicorn.run(application, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+def paths(args):
+    """Rutas que atiende asgi.py sin pasar por la cache del catalogo."""
+    rnd = random.Random(args.seed)
+    favorito = lambda: rnd.randint(1, args.favoritos)  # noqa: E731
+    choices = [
+        lambda: f"/favoritos/{favorito()}",
+        lambda: "/favoritos/batch?ids=" + ",".join(str(favorito()) for _ in range(10)),
+        lambda: "/users/favoritos?limit=10",
+        lambda: "/users/favoritos/pokeballs?limit=10",
+    ]
+    return [rnd.choice(choices)() for _ in range(args.requests)]
+
+
+def load(port, urls, concurrency):
+    """Lanza urls con `concurrency` clientes a la vez, cada uno con su conexion HTTP."""
+    latencies, errors = [], []
+    lock = threading.Lock()
+    pending = iter(urls)
+
+    def client():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+        while True:
+            with lock:
+                url = next(pending, None)
+            if url is None:
+                return
+            start = time.perf_counter()
+            try:
+                conn.request("GET", url)
+                response = conn.getresponse()
+                response.read()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+                ok = False
+            with lock:
+                (latencies if ok else errors).append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000 if latencies else 0  # noqa: E731
+    return {"rps": len(latencies) / elapsed, "p50": pct(50), "p95": pct(95), "errors": len(errors)}
+
+
+def run(mode, args, levels):
+    server = subprocess.Popen(
+        [sys.executable, __file__, "--serve", mode] + [
+            f"--{name.replace('_', '-')}={getattr(args, name)}" for name in ("port", "workers", "latency_ms")],
+        cwd=ROOT, env=dict(os.environ))
+    try:
+        for _ in range(200):
+            try:
+                conn = http.client.HTTPConnection("127.0.0.1", args.port, timeout=1)
+                conn.request("GET", "/users/favoritos?limit=1")
+                conn.getresponse().read()
+                break
+            except OSError:
+                time.sleep(0.1)
+        urls = paths(args)
+        load(args.port, urls[:50], 10)  # calentamiento
+        return {level: load(args.port, urls, level) for level in levels}
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--pokemon", type=int, default=500)
+    parser.add_argument("--pokeballs", type=int, default=50)
+    parser.add_argument("--favoritos", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--latency-ms", type=float, default=20, help="latencia simulada por sentencia SQL")
+    parser.add_argument("--concurrency", default="1,10,50,200", help="clientes simultaneos, separados por comas")
+    parser.add_argument("--requests", type=int, default=1000, help="peticiones por nivel de concurrencia")
+    parser.add_argument("--workers", type=int, default=4, help="workers sync de gunicorn")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--serve", choices=("sync", "async"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve == "sync":
+        return serve_sync(args)
+    if args.serve == "async":
+        return serve_async(args)
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    seed(args)
+    results = {
+        f"sync (gunicorn, {args.workers} workers)": run("sync", args, levels),
+        "async (uvicorn, 1 proceso)": run("async", args, levels),
+    }
+    print(f"\nlatencia simulada: {args.latency_ms:g} ms por sentencia, {args.requests} peticiones por nivel")
+    print(f"{'modo':<30} {'clientes':>8} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'errores':>8}")
+    for mode, by_level in results.items():
+        for level, stats in by_level.items():
+            print(f"{mode:<30} {level:>8} {stats['rps']:>9.1f} {stats['p50']:>9.1f} "
+                  f"{stats['p95']:>9.1f} {stats['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""
+Benchmark de todos los endpoints de src/app.py.
+
+Crea una base de datos SQLite con el volumen pedido de usuarios, pokemon,
+pokeballs y favoritos, lanza cada ruta con el test client de Flask y (con
+--gunicorn) contra un proceso real de gunicorn, y muestra p50/p95/p99, req/s y
+sentencias SQL por peticion: con el test client contadas con un evento del engine
+(tambien las de las respuestas en streaming) y con gunicorn leidas de la cabecera
+Server-Timing, que las respuestas en streaming no llevan.
+
+    python benchmarks/bench_endpoints.py --users 2000 --requests 200
+    python benchmarks/bench_endpoints.py --gunicorn --workers 4
+    python benchmarks/bench_endpoints.py --save-baseline      # guarda benchmarks/baseline.json
+    python benchmarks/bench_endpoints.py --compare            # falla si empeora respecto al baseline
+                                                              # (hecho con los mismos parametros)
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SRC = os.path.join(ROOT, "src")
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "bench_endpoints.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("CACHE_BACKEND", "memory")
+sys.path.insert(0, SRC)
+
+from sqlalchemy import event, insert  # noqa: E402
+from app import app  # noqa: E402
+from models import db, User, Pokemon, Pokeballs, Favoritos, refresh_favorite_counts  # noqa: E402
+
+SERVER_TIMING = re.compile(r'desc="(\d+) queries"')
+# rutas que no se miden: las de flask-admin y los ficheros estaticos
+IGNORED_ENDPOINTS = ("static", "admin.", "user.")
+
+
+def seed(args):
+    """Crea la base de datos de cero. Ademas de los datos pedidos guarda un hueco de
+    pokemon y pokeballs sin favoritos para que los DELETE tengan que borrar."""
+    rnd = random.Random(args.seed)
+    # uno por peticion para los DELETE de uno en uno y cinco por peticion para los bulk
+    spare = args.requests * 6
+    with app.app_context():
+        # cerramos las conexiones abiertas para no seguir usando el fichero borrado
+        db.session.remove()
+        db.engine.dispose()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(DB_PATH + suffix):
+                os.remove(DB_PATH + suffix)
+        db.create_all()
+        db.session.execute(insert(Pokemon), [
+            {"name": f"pokemon{i}", "url": f"https://pokeapi.co/{i}"} for i in range(args.pokemon + spare)])
+        db.session.execute(insert(Pokeballs), [
+            {"nombre": f"ball{i}", "efectividad": i % 100, "descripcion": f"desc{i}"}
+            for i in range(args.pokeballs + spare)])
+        db.session.execute(insert(User), [{"name": f"user{i}"} for i in range(args.users)])
+        favoritos = []
+        for user_id in range(1, args.users + 1):
+            for pokemon_id in rnd.sample(range(1, args.pokemon + 1), min(args.favoritos, args.pokemon)):
+                favoritos.append({"user_id": user_id, "pokemon_id": pokemon_id})
+        db.session.execute(insert(Favoritos), favoritos)
+        refresh_favorite_counts()
+        db.session.commit()
+        db.session.remove()
+        db.engine.dispose()
+    return {
+        "pokemon_spare": args.pokemon + 1,
+        "pokeball_spare": args.pokeballs + 1,
+        "favoritos": len(favoritos),
+    }
+
+
+def scenarios(args, info):
+    """(nombre, metodo, ruta(i), cuerpo(i), content-type) para cada endpoint de la API."""
+    rnd = random.Random(args.seed)
+    user = lambda i: rnd.randint(1, args.users)  # noqa: E731
+    pokemon = lambda i: rnd.randint(1, args.pokemon)  # noqa: E731
+    pokeball = lambda i: rnd.randint(1, args.pokeballs)  # noqa: E731
+    run = f"{int(time.time() * 1000)}"
+    # los bulk borran de cinco en cinco detras de los que usan los DELETE de uno en uno
+    bulk_ids = lambda start, i: list(range(start + args.requests + 5 * i, start + args.requests + 5 * i + 5))  # noqa: E731
+    return [
+        ("sitemap", "GET", lambda i: "/", None, None),
+        ("hello", "GET", lambda i: "/user", None, None),
+        ("pokemon list", "GET", lambda i: "/pokemon", None, None),
+        ("pokemon page", "GET", lambda i: "/pokemon?limit=50", None, None),
+        ("pokemon search", "GET", lambda i: f"/pokemon?name_prefix=pokemon{i % 10}&sort=-favorite_count&limit=20",
+         None, None),
+        ("pokeballs search", "GET", lambda i: f"/pokeballs?q=ball{i % 10}&sort=nombre", None, None),
+        ("pokemon stream", "GET", lambda i: "/pokemon?stream=ndjson", None, None),
+        ("pokemon one", "GET", lambda i: f"/pokemon/{pokemon(i)}", None, None),
+        ("pokeballs list", "GET", lambda i: "/pokeballs", None, None),
+        ("pokeball one", "GET", lambda i: f"/pokeball/{pokeball(i)}", None, None),
+        ("users list", "GET", lambda i: "/users", None, None),
+        ("users page", "GET", lambda i: "/users?limit=50", None, None),
+        ("users lean list", "GET", lambda i: "/users?fields=id,nombre", None, None),
+        ("users lean page", "GET", lambda i: "/users?fields=nombre&limit=50", None, None),
+        ("favoritos ranking", "GET", lambda i: "/users/favoritos?limit=20", None, None),
+        ("pokeballs ranking", "GET", lambda i: "/users/favoritos/pokeballs", None, None),
+        ("favorito one", "GET", lambda i: f"/favoritos/{rnd.randint(1, info['favoritos'])}", None, None),
+        ("pokemon batch", "GET", lambda i: "/pokemon/batch?ids=" + ",".join(
+            str(pokemon(i)) for _ in range(20)), None, None),
+        ("pokeball batch", "POST", lambda i: "/pokeball/batch",
+         lambda i: json.dumps({"ids": [pokeball(i) for _ in range(10)]}), "application/json"),
+        ("favoritos batch", "GET", lambda i: "/favoritos/batch?ids=" + ",".join(
+            str(rnd.randint(1, info["favoritos"])) for _ in range(20)), None, None),
+        ("cache stats", "GET", lambda i: "/cache/stats", None, None),
+        ("db pool", "GET", lambda i: "/db/pool", None, None),
+        ("db stats", "GET", lambda i: "/db/stats", None, None),
+        ("metrics", "GET", lambda i: "/metrics", None, None),
+        ("create users", "POST", lambda i: "/createusers",
+         lambda i: json.dumps([{"name": f"bench-{run}-{i}", "favoritos": [pokemon(i), pokemon(i)]}]),
+         "application/json"),
+        ("import users", "POST", lambda i: "/importusers",
+         lambda i: "\n".join(json.dumps({"name": f"import-{run}-{i}-{j}", "favoritos": [pokemon(i)]})
+                             for j in range(10)),
+         "application/x-ndjson"),
+        ("favorito pokemon", "POST", lambda i: f"/favorito/pokemon/{user(i)}",
+         lambda i: json.dumps({"name": f"fav-{run}-{i}", "url": f"u-{run}-{i}"}), "application/json"),
+        ("favorito pokeball", "POST", lambda i: f"/favorito/pokeballs/{user(i)}",
+         lambda i: json.dumps({"nombre": f"fav-{run}-{i}", "efectividad": 1, "descripcion": f"d-{run}-{i}"}),
+         "application/json"),
+        ("update pokemon", "PUT", lambda i: f"/pokemonput/{pokemon(i)}",
+         lambda i: json.dumps({"name": f"renamed-{i}"}), "application/json"),
+        ("delete favorito", "DELETE", lambda i: f"/favorito/pokemon/{i + 1}", None, None),
+        ("delete pokemon", "DELETE", lambda i: f"/delete/{info['pokemon_spare'] + i}", None, None),
+        ("delete pokeball", "DELETE", lambda i: f"/pokeball/delete/{info['pokeball_spare'] + i}", None, None),
+        ("bulk update pokemon", "PUT", lambda i: "/pokemon/bulk",
+         lambda i: json.dumps({"ids": [pokemon(i) for _ in range(20)], "name": f"bulk-{i}"}), "application/json"),
+        ("bulk delete favoritos", "DELETE", lambda i: "/favoritos/bulk",
+         lambda i: json.dumps({"ids": list(range(args.requests + 5 * i + 1, args.requests + 5 * i + 6))}),
+         "application/json"),
+        ("bulk delete pokemon", "DELETE", lambda i: "/pokemon/bulk",
+         lambda i: json.dumps({"ids": bulk_ids(info["pokemon_spare"], i)}), "application/json"),
+        ("bulk delete pokeball", "DELETE", lambda i: "/pokeball/bulk",
+         lambda i: json.dumps({"ids": bulk_ids(info["pokeball_spare"], i)}), "application/json"),
+    ]
+
+
+def check_coverage(cases):
+    # avisa si se anade una ruta a la app sin escenario en este benchmark
+    covered = {re.sub(r"/\d+", "/<int:id>", path(0).split("?")[0]) for _, _, path, _, _ in cases}
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint.startswith(IGNORED_ENDPOINTS):
+            continue
+        if rule.rule not in covered:
+            print(f"aviso: la ruta {rule.rule} no tiene escenario en el benchmark", file=sys.stderr)
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(pct / 100 * len(values)) - 1))
+    return values[index]
+
+
+def summarize(latencies, queries, elapsed):
+    return {
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "rps": round(len(latencies) / elapsed, 1),
+        # None si alguna respuesta no traia Server-Timing (streaming con gunicorn)
+        "queries": None if None in queries else round(sum(queries) / len(queries), 2),
+    }
+
+
+def queries_from(header):
+    match = SERVER_TIMING.search(header or "")
+    return int(match.group(1)) if match else None
+
+
+def run_client(cases, args):
+    client = app.test_client()
+    executed = []
+
+    def count_query(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    with app.app_context():
+        event.listen(db.engine, "after_cursor_execute", count_query)
+    try:
+        results = {}
+        for name, method, path, body, content_type in cases:
+            latencies, queries = [], []
+            total = time.perf_counter()
+            for i in range(args.requests):
+                data = body(i) if body else None
+                executed.clear()
+                start = time.perf_counter()
+                response = client.open(path(i), method=method, data=data, content_type=content_type)
+                response.get_data()
+                response.close()
+                latencies.append(time.perf_counter() - start)
+                queries.append(len(executed))
+                if response.status_code >= 500:
+                    raise RuntimeError(f"{name}: {method} {path(i)} -> {response.status_code}")
+            results[name] = summarize(latencies, queries, time.perf_counter() - total)
+        return results
+    finally:
+        with app.app_context():
+            event.remove(db.engine, "after_cursor_execute", count_query)
+
+
+def run_gunicorn(cases, args):
+    port = args.port
+    server = subprocess.Popen(
+        ["gunicorn", "wsgi", "--chdir", SRC, "-w", str(args.workers), "-b", f"127.0.0.1:{port}",
+         "--log-level", "warning"],
+        cwd=ROOT, env=dict(os.environ))
+    try:
+        for _ in range(100):
+            try:
+                http.client.HTTPConnection("127.0.0.1", port, timeout=1).request("GET", "/user")
+                break
+            except OSError:
+                time.sleep(0.1)
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        results = {}
+        for name, method, path, body, content_type in cases:
+            latencies, queries = [], []
+            total = time.perf_counter()
+            for i in range(args.requests):
+                headers = {"Content-Type": content_type} if content_type else {}
+                start = time.perf_counter()
+                conn.request(method, path(i), body=body(i) if body else None, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                latencies.append(time.perf_counter() - start)
+                queries.append(queries_from(response.getheader("Server-Timing")))
+                if response.status >= 500:
+                    raise RuntimeError(f"{name}: {method} {path(i)} -> {response.status}")
+            results[name] = summarize(latencies, queries, time.perf_counter() - total)
+        return results
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+
+def format_queries(queries):
+    return "-" if queries is None else f"{queries:.2f}"
+
+
+def print_results(mode, results, baseline=None):
+    print(f"\n[{mode}]")
+    print(f"{'ruta':<20} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9} {'queries':>8}")
+    for name, r in results.items():
+        line = (f"{name:<20} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} "
+                f"{r['rps']:>9.1f} {format_queries(r['queries']):>8}")
+        if baseline and name in baseline:
+            line += (f"   (baseline p95 {baseline[name]['p95_ms']:.2f}, "
+                     f"queries {format_queries(baseline[name]['queries'])})")
+        print(line)
+
+
+def regressions(mode, results, baseline, args):
+    found = []
+    for name, r in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        # las queries por peticion no dependen de la maquina, pero en las rutas con cache la
+        # media tiene decimales segun cuantas peticiones fallan la cache: margen query_tolerance
+        if None not in (r["queries"], base["queries"]) and r["queries"] > base["queries"] + args.query_tolerance:
+            found.append(f"{mode} / {name}: queries {base['queries']} -> {r['queries']}")
+        # la latencia es ruidosa: margen relativo y ademas unos milisegundos para las rutas rapidas
+        if r["p95_ms"] > base["p95_ms"] * (1 + args.tolerance) + args.slack_ms:
+            found.append(f"{mode} / {name}: p95 {base['p95_ms']}ms -> {r['p95_ms']}ms")
+    return found
+
+
+def baseline_params(args):
+    # lo que cambia el volumen de datos o de peticiones: con otros valores no se puede comparar
+    return {k: getattr(args, k) for k in ("users", "pokemon", "pokeballs", "favoritos", "requests", "seed", "workers")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--pokemon", type=int, default=500)
+    parser.add_argument("--pokeballs", type=int, default=50)
+    parser.add_argument("--favoritos", type=int, default=5, help="favoritos por usuario")
+    parser.add_argument("--requests", type=int, default=100, help="peticiones por ruta")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--gunicorn", action="store_true", help="medir tambien contra gunicorn")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true", help="comparar con el baseline y fallar si empeora")
+    parser.add_argument("--tolerance", type=float, default=1.0,
+                        help="margen relativo de p95 para --compare (1.0 = hasta el doble)")
+    parser.add_argument("--slack-ms", type=float, default=2.0, help="margen absoluto de p95 para --compare")
+    parser.add_argument("--query-tolerance", type=float, default=0.5,
+                        help="aumento de queries por peticion (media) que se admite en --compare")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            sys.exit(f"no existe el baseline {args.baseline}: crealo con --save-baseline")
+        with open(args.baseline) as f:
+            saved = json.load(f)
+        params = saved.get("params", {})
+        distintos = {k: (params.get(k), v) for k, v in baseline_params(args).items() if params.get(k) != v}
+        if distintos:
+            sys.exit("el baseline se hizo con otros parametros (baseline -> ahora): " + ", ".join(
+                f"--{k} {antes} -> {ahora}" for k, (antes, ahora) in distintos.items()))
+        baseline = saved["results"]
+
+    results = {}
+    cases = scenarios(args, seed(args))
+    check_coverage(cases)
+    results["client"] = run_client(cases, args)
+    if args.gunicorn:
+        cases = scenarios(args, seed(args))
+        results["gunicorn"] = run_gunicorn(cases, args)
+
+    found = []
+    for mode, mode_results in results.items():
+        print_results(mode, mode_results, baseline.get(mode))
+        found += regressions(mode, mode_results, baseline.get(mode, {}), args)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"params": baseline_params(args), "results": results}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nbaseline guardado en {args.baseline}")
+    if found:
+        print("\nregresiones:\n  " + "\n  ".join(found))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Mide el tiempo de codificar respuestas grandes con el encoder estandar y con
+orjson (si esta instalado), y los bytes que viajan sin comprimir, con gzip y con
+deflate. Las filas imitan /users, con favoritos anidados.
+
+    python benchmarks/bench_json.py --rows 10000 100000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from app import app  # noqa: E402
+from compression import _compressor  # noqa: E402
+from json_provider import FastJSONProvider, orjson  # noqa: E402
+
+
+def make_users(rows):
+    return [{
+        "id": i,
+        "nombre": f"usuario{i}",
+        "favoritos": [{"pokemon_id": (i * 7 + j) % 1000, "pokemon_nombre": f"pokemon{(i * 7 + j) % 1000}"}
+                      for j in range(3)]
+    } for i in range(rows)]
+
+
+def encode_time(provider, data, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with app.app_context():
+            body = provider.response(data).get_data()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, body
+
+
+def compressed_size(body, encoding):
+    compressor = _compressor(encoding, int(os.environ.get("COMPRESS_LEVEL", 6)))
+    start = time.perf_counter()
+    size = len(compressor.compress(body) + compressor.flush())
+    return size, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    encoders = ["stdlib"] + (["orjson"] if orjson else [])
+    print(f"{'filas':>8} {'encoder':>8} {'codificar':>10} {'sin comprimir':>14} "
+          f"{'gzip':>18} {'deflate':>18}")
+    for rows in args.rows:
+        data = make_users(rows)
+        for encoder in encoders:
+            os.environ["JSON_ENCODER"] = encoder
+            elapsed, body = encode_time(FastJSONProvider(app), data, args.repeat)
+            gzip_size, gzip_time = compressed_size(body, "gzip")
+            deflate_size, deflate_time = compressed_size(body, "deflate")
+            print(f"{rows:>8} {encoder:>8} {elapsed * 1000:>8.1f}ms {len(body):>12,}B "
+                  f"{gzip_size:>9,}B {gzip_time * 1000:>5.0f}ms {deflate_size:>9,}B {deflate_time * 1000:>5.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
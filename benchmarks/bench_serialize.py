@@ -0,0 +1,64 @@
+"""
+Compara filas/segundo entre leer objetos ORM + serialize() y leer solo las
+columnas serializadas como diccionarios.
+
+    python benchmarks/bench_serialize.py --rows 100000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sqlalchemy import insert, select  # noqa: E402
+from app import app  # noqa: E402
+from models import db, Pokemon, Pokeballs  # noqa: E402
+
+
+def orm_path(model):
+    return [obj.serialize() for obj in db.session.execute(select(model)).scalars().all()]
+
+
+def columns_path(model):
+    return [dict(row) for row in db.session.execute(select(*model.serialized_columns())).mappings()]
+
+
+def measure(fn, model, rows, repeat):
+    best = None
+    for _ in range(repeat):
+        # vaciamos el identity map para que cada vuelta cree los objetos de cero
+        db.session.expunge_all()
+        start = time.perf_counter()
+        fn(model)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return rows / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        db.session.execute(insert(Pokemon), [
+            {"name": f"pokemon{i}", "url": f"url{i}"} for i in range(args.rows)])
+        db.session.execute(insert(Pokeballs), [
+            {"nombre": f"ball{i}", "efectividad": i % 100, "descripcion": f"desc{i}"}
+            for i in range(args.rows)])
+        db.session.commit()
+
+        print(f"{'modelo':<10} {'orm + serialize':>18} {'columnas':>18} {'mejora':>8}")
+        for model in (Pokemon, Pokeballs):
+            orm = measure(orm_path, model, args.rows, args.repeat)
+            cols = measure(columns_path, model, args.rows, args.repeat)
+            print(f"{model.__name__:<10} {orm:>14,.0f} r/s {cols:>14,.0f} r/s {cols / orm:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
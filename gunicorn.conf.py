@@ -0,0 +1,18 @@
+# gunicorn lee este fichero al arrancar desde la raiz del proyecto (Procfile / render.yaml)
+import os
+import shutil
+import tempfile
+
+
+def on_starting(server):
+    # directorio compartido para las metricas de Prometheus de todos los workers;
+    # se vacia en cada arranque para no sumar procesos de ejecuciones anteriores
+    path = os.environ.setdefault(
+        "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "prometheus-metrics"))
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,28 @@
+"""functional indexes on normalized pokemon and pokeball names
+
+Revision ID: 2f6d8c1b7e45
+Revises: b83d05e6c91a
+Create Date: 2026-10-18 10:48:13.552907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2f6d8c1b7e45'
+down_revision = 'b83d05e6c91a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_pokemon_name_normalizado', 'pokemon',
+                    [sa.text('lower(trim(name))')], unique=False)
+    op.create_index('ix_pokeballs_nombre_normalizado', 'pokeballs',
+                    [sa.text('lower(trim(nombre))')], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_pokeballs_nombre_normalizado', table_name='pokeballs')
+    op.drop_index('ix_pokemon_name_normalizado', table_name='pokemon')
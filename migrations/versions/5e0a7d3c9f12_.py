@@ -0,0 +1,33 @@
+"""table_version counters for ETag / Last-Modified
+
+Revision ID: 5e0a7d3c9f12
+Revises: 2f6d8c1b7e45
+Create Date: 2026-10-18 12:21:05.117436
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e0a7d3c9f12'
+down_revision = '2f6d8c1b7e45'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('table_version',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.execute(
+        "INSERT INTO table_version (name, version, updated_at) VALUES "
+        "('user', 1, CURRENT_TIMESTAMP), ('pokemon', 1, CURRENT_TIMESTAMP), "
+        "('pokeballs', 1, CURRENT_TIMESTAMP), ('favoritos', 1, CURRENT_TIMESTAMP)")
+
+
+def downgrade():
+    op.drop_table('table_version')
@@ -0,0 +1,44 @@
+"""add favorite_count counters to pokemon and pokeballs
+
+Revision ID: 7c1e9a4f2b30
+Revises: ef67642a5219
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c1e9a4f2b30'
+down_revision = 'ef67642a5219'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('pokemon', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('favorite_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_index(batch_op.f('ix_pokemon_favorite_count'), ['favorite_count'], unique=False)
+
+    with op.batch_alter_table('pokeballs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('favorite_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_index(batch_op.f('ix_pokeballs_favorite_count'), ['favorite_count'], unique=False)
+
+    # rellenamos los contadores con los favoritos que ya existen
+    op.execute(
+        "UPDATE pokemon SET favorite_count = "
+        "(SELECT COUNT(*) FROM favoritos WHERE favoritos.pokemon_id = pokemon.id)")
+    op.execute(
+        "UPDATE pokeballs SET favorite_count = "
+        "(SELECT COUNT(*) FROM favoritos WHERE favoritos.pokeballs_id = pokeballs.id)")
+
+
+def downgrade():
+    with op.batch_alter_table('pokeballs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_pokeballs_favorite_count'))
+        batch_op.drop_column('favorite_count')
+
+    with op.batch_alter_table('pokemon', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_pokemon_favorite_count'))
+        batch_op.drop_column('favorite_count')
@@ -0,0 +1,34 @@
+"""trigram indexes for name search on pokemon and pokeballs
+
+Revision ID: 9d4b2e7a1c68
+Revises: 5e0a7d3c9f12
+Create Date: 2026-10-18 14:12:40.318275
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4b2e7a1c68'
+down_revision = '5e0a7d3c9f12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ?q= (ILIKE '%...%') solo puede usar indice en Postgres, con pg_trgm; los filtros
+    # exactos y por prefijo usan los indices de lower(trim(...)) de 2f6d8c1b7e45
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_pokemon_name_trgm', 'pokemon', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_pokeballs_nombre_trgm', 'pokeballs', ['nombre'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'nombre': 'gin_trgm_ops'})
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_pokeballs_nombre_trgm', table_name='pokeballs')
+    op.drop_index('ix_pokemon_name_trgm', table_name='pokemon')
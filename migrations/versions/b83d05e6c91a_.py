@@ -0,0 +1,52 @@
+"""index favoritos foreign keys and add partial unique indexes
+
+Revision ID: b83d05e6c91a
+Revises: 7c1e9a4f2b30
+Create Date: 2026-10-18 10:02:57.904112
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b83d05e6c91a'
+down_revision = '7c1e9a4f2b30'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # los indices unicos fallan si ya hay favoritos repetidos: nos quedamos con el mas antiguo
+    op.execute(
+        "DELETE FROM favoritos WHERE pokemon_id IS NOT NULL AND id NOT IN "
+        "(SELECT MIN(id) FROM favoritos WHERE pokemon_id IS NOT NULL GROUP BY user_id, pokemon_id)")
+    op.execute(
+        "DELETE FROM favoritos WHERE pokeballs_id IS NOT NULL AND id NOT IN "
+        "(SELECT MIN(id) FROM favoritos WHERE pokeballs_id IS NOT NULL GROUP BY user_id, pokeballs_id)")
+    op.execute(
+        "UPDATE pokemon SET favorite_count = "
+        "(SELECT COUNT(*) FROM favoritos WHERE favoritos.pokemon_id = pokemon.id)")
+    op.execute(
+        "UPDATE pokeballs SET favorite_count = "
+        "(SELECT COUNT(*) FROM favoritos WHERE favoritos.pokeballs_id = pokeballs.id)")
+
+    with op.batch_alter_table('favoritos', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_favoritos_user_id'), ['user_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_favoritos_pokemon_id'), ['pokemon_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_favoritos_pokeballs_id'), ['pokeballs_id'], unique=False)
+        batch_op.create_index('uq_favoritos_user_pokemon', ['user_id', 'pokemon_id'], unique=True,
+                              postgresql_where=sa.text('pokemon_id IS NOT NULL'),
+                              sqlite_where=sa.text('pokemon_id IS NOT NULL'))
+        batch_op.create_index('uq_favoritos_user_pokeballs', ['user_id', 'pokeballs_id'], unique=True,
+                              postgresql_where=sa.text('pokeballs_id IS NOT NULL'),
+                              sqlite_where=sa.text('pokeballs_id IS NOT NULL'))
+
+
+def downgrade():
+    with op.batch_alter_table('favoritos', schema=None) as batch_op:
+        batch_op.drop_index('uq_favoritos_user_pokeballs')
+        batch_op.drop_index('uq_favoritos_user_pokemon')
+        batch_op.drop_index(batch_op.f('ix_favoritos_pokeballs_id'))
+        batch_op.drop_index(batch_op.f('ix_favoritos_pokemon_id'))
+        batch_op.drop_index(batch_op.f('ix_favoritos_user_id'))
@@ -0,0 +1,66 @@
+"""store normalized pokemon and pokeball names in their own indexed columns
+
+Revision ID: c4e8a1f07b52
+Revises: 9d4b2e7a1c68
+Create Date: 2026-10-18 20:41:09.527310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8a1f07b52'
+down_revision = '9d4b2e7a1c68'
+branch_labels = None
+depends_on = None
+
+
+def normalizar_nombre(nombre):
+    # copia de models.normalizar_nombre: la migracion no debe depender del modelo actual
+    return nombre.strip().lower()
+
+
+def rellenar(tabla, columna):
+    # los nombres se normalizan en Python (lower/trim de SQLite solo entienden ASCII y espacios)
+    conn = op.get_bind()
+    filas = conn.execute(sa.text(f'SELECT id, {columna} FROM {tabla}')).all()
+    if filas:
+        conn.execute(
+            sa.text(f'UPDATE {tabla} SET {columna}_normalizado = :normalizado WHERE id = :id'),
+            [{'id': id, 'normalizado': normalizar_nombre(nombre or '')} for id, nombre in filas])
+
+
+def upgrade():
+    # sustituyen a los indices de expresion de 2f6d8c1b7e45
+    op.drop_index('ix_pokeballs_nombre_normalizado', table_name='pokeballs')
+    op.drop_index('ix_pokemon_name_normalizado', table_name='pokemon')
+
+    with op.batch_alter_table('pokemon', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('name_normalizado', sa.String(length=100), nullable=True))
+    with op.batch_alter_table('pokeballs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('nombre_normalizado', sa.String(length=100), nullable=True))
+
+    rellenar('pokemon', 'name')
+    rellenar('pokeballs', 'nombre')
+
+    with op.batch_alter_table('pokemon', schema=None) as batch_op:
+        batch_op.alter_column('name_normalizado', existing_type=sa.String(length=100), nullable=False)
+        batch_op.create_index(batch_op.f('ix_pokemon_name_normalizado'), ['name_normalizado'], unique=False)
+    with op.batch_alter_table('pokeballs', schema=None) as batch_op:
+        batch_op.alter_column('nombre_normalizado', existing_type=sa.String(length=100), nullable=False)
+        batch_op.create_index(batch_op.f('ix_pokeballs_nombre_normalizado'), ['nombre_normalizado'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('pokeballs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_pokeballs_nombre_normalizado'))
+        batch_op.drop_column('nombre_normalizado')
+    with op.batch_alter_table('pokemon', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_pokemon_name_normalizado'))
+        batch_op.drop_column('name_normalizado')
+
+    op.create_index('ix_pokemon_name_normalizado', 'pokemon',
+                    [sa.text('lower(trim(name))')], unique=False)
+    op.create_index('ix_pokeballs_nombre_normalizado', 'pokeballs',
+                    [sa.text('lower(trim(nombre))')], unique=False)
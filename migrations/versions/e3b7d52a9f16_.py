@@ -0,0 +1,37 @@
+"""C collation for the normalized name columns on Postgres
+
+Revision ID: e3b7d52a9f16
+Revises: c4e8a1f07b52
+Create Date: 2026-10-18 22:16:48.072951
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3b7d52a9f16'
+down_revision = 'c4e8a1f07b52'
+branch_labels = None
+depends_on = None
+
+COLUMNAS = (('pokemon', 'name_normalizado'), ('pokeballs', 'nombre_normalizado'))
+
+
+def upgrade():
+    # ?name_prefix= busca con un rango (p <= valor < p + U+10FFFF) que solo es correcto con
+    # orden por codigo; con el locale de la base de datos podria saltarse filas.
+    # SQLite ya compara asi (BINARY). Postgres rehace los indices al cambiar el tipo
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for tabla, columna in COLUMNAS:
+        op.alter_column(tabla, columna, existing_type=sa.String(length=100),
+                        type_=sa.String(length=100, collation='C'), existing_nullable=False)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for tabla, columna in COLUMNAS:
+        op.alter_column(tabla, columna, existing_type=sa.String(length=100, collation='C'),
+                        type_=sa.String(length=100), existing_nullable=False)
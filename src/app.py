@@ -4,18 +4,34 @@ This module takes care of starting the API Server, Loading the DB and Adding the
 """
 
 import os
+import json
+import click
 from flask import Flask, request, jsonify, url_for
 from flask_migrate import Migrate
 from flask_swagger import swagger
 from flask_cors import CORS
-from utils import APIException, generate_sitemap
+from utils import APIException, generate_sitemap, wants_pagination, keyset_paginate, parse_limit, parse_ids, parse_sort, sort_order, parse_fields, MAX_BULK_IDS, chunked, stream_format, stream_rows, conditional_get, table_version_stamp
 from admin import setup_admin
-from sqlalchemy import select
-from models import db, Pokemon, Pokeballs, User, Favoritos
+from cache import create_cache
+from compression import setup_compression
+from instrumentation import setup_query_stats
+from metrics import setup_metrics
+from json_provider import FastJSONProvider
+from seed import seed_database
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
+from models import db, Pokemon, Pokeballs, User, Favoritos, normalizar_nombre, refresh_favorite_counts, table_versions, engine_options, pool_stats, configure_sqlite
 # from models import Person
 
+# carga favoritos y sus pokemon/pokeballs con un SELECT ... IN por relacion,
+# asi User.serialize no lanza una query por cada favorito (N+1)
+USER_FAVORITOS_LOAD = selectinload(User.favoritos).options(
+    selectinload(Favoritos.pokemon), selectinload(Favoritos.pokeballs))
+
 app = Flask(__name__)
 app.url_map.strict_slashes = False
+app.json = FastJSONProvider(app)
 
 db_url = os.getenv("DATABASE_URL")
 if db_url is not None:
@@ -24,11 +40,49 @@ if db_url is not None:
 else:
     app.config['SQLALCHEMY_DATABASE_URI'] = "sqlite:////tmp/test.db"
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+
+# cache de lectura del catalogo (pokemon y pokeballs), se invalida al escribir;
+# con CACHE_BACKEND=sqlite la comparten todos los workers de gunicorn de la maquina
+catalog_cache = create_cache(
+    os.getenv("CACHE_BACKEND", "memory"),
+    maxsize=int(os.getenv("CATALOG_CACHE_SIZE", 1024)),
+    ttl=int(os.getenv("CATALOG_CACHE_TTL", 300)),
+    path=os.getenv("CACHE_SQLITE_PATH"))
+
+
+def leer_dict(stmt):
+    # primera fila de un select de columnas como diccionario, o None
+    row = db.session.execute(stmt).mappings().one_or_none()
+    return dict(row) if row is not None else None
+
+
+def leer_por_ids(stmt, ids, serializer):
+    """Ejecuta stmt (ya filtrado con WHERE id IN ids) y devuelve los resultados por id,
+    con null para los que no existen y la lista de esos ids en "not_found"."""
+    return resultados_por_ids(db.session.execute(stmt), ids, serializer)
+
+
+def resultados_por_ids(rows, ids, serializer):
+    # tambien lo usa asgi.py con las filas de su engine asincrono
+    found = {row.id: serializer(row) for row in rows}
+    return {
+        "results": {str(id): found.get(id) for id in ids},
+        "not_found": [id for id in ids if id not in found]
+    }
+
 
 MIGRATE = Migrate(app, db)
 db.init_app(app)
+# con SQLite (p.ej. sin DATABASE_URL) activamos WAL, busy_timeout, etc. en cada conexion
+with app.app_context():
+    if db.engine.dialect.name == "sqlite" and db.engine.url.database not in (None, "", ":memory:"):
+        configure_sqlite(db.engine)
 CORS(app)
 setup_admin(app)
+setup_query_stats(app, db)
+setup_metrics(app, db)
+setup_compression(app)
 
 # Handle/serialize errors like a JSON object
 
@@ -55,60 +109,173 @@ def handle_hello():
     return jsonify(response_body), 200
 
 
+# columnas por las que se puede ordenar con ?sort= (todas con indice)
+POKEMON_SORTS = {"name": Pokemon.name_normalizado, "favorite_count": Pokemon.favorite_count}
+POKEBALLS_SORTS = {"nombre": Pokeballs.nombre_normalizado, "favorite_count": Pokeballs.favorite_count}
+
+
+def filtrar_nombre(stmt, campo, column, normalizado):
+    """Filtros de texto de /pokemon y /pokeballs:
+    ?<campo>= igual sin distinguir mayusculas ni espacios alrededor, ?<campo>_prefix= empieza
+    por (los dos sobre el indice de la columna normalizada) y ?q= contiene (en Postgres
+    con el indice de trigramas; en SQLite recorre la tabla)."""
+    args = request.args
+    if args.get(campo):
+        stmt = stmt.where(normalizado == normalizar_nombre(args[campo]))
+    if args.get(f"{campo}_prefix"):
+        # empieza por p <=> p <= valor < p + el ultimo caracter unicode; solo vale con orden
+        # por codigo, por eso la columna es COLLATE "C" en Postgres (models.NombreNormalizado)
+        prefix = args[f"{campo}_prefix"].lstrip().lower()
+        stmt = stmt.where(normalizado >= prefix, normalizado < prefix + "\U0010ffff")
+    if args.get("q"):
+        stmt = stmt.where(column.icontains(args["q"], autoescape=True))
+    return stmt
+
+
+def consulta_catalogo(campo):
+    # con filtros u orden la respuesta no es la lista completa que se guarda en cache
+    return any(request.args.get(arg) for arg in (campo, f"{campo}_prefix", "q", "sort"))
+
+
 # GET: Muestra todos los pokemon que hay
+# con ?limit=&after= devuelve una pagina {"results": [...], "next": cursor}
+# con ?stream=json|ndjson la respuesta se va enviando por lotes
+# filtros ?name= / ?name_prefix= / ?q= y orden ?sort=name|favorite_count (- delante para descendente)
 @app.route("/pokemon", methods=["GET"])
+@conditional_get(lambda: table_versions("pokemon"))
 def get_pokemon():
-    stmt = select(Pokemon)
-    # Esto te da una lista de instancias de Pokemon
-    pokemons = db.session.execute(stmt).scalars().all()
-    return jsonify([p.serialize() for p in pokemons]), 200
-
-
+    sort = parse_sort(request.args, POKEMON_SORTS)
+    stmt = filtrar_nombre(select(Pokemon), "name", Pokemon.name, Pokemon.name_normalizado)
+    if wants_pagination(request.args):
+        return jsonify(keyset_paginate(db.session, stmt, Pokemon.id, request.args, Pokemon.serialize, sort=sort)), 200
+    fmt = stream_format(request.args)
+    if fmt:
+        return stream_rows(db.session, stmt.order_by(*sort_order(sort, Pokemon.id)), Pokemon.serialize, fmt)
+    # solo las columnas que se serializan, como diccionarios (sin objetos ORM)
+    columnas = filtrar_nombre(select(*Pokemon.serialized_columns()), "name", Pokemon.name, Pokemon.name_normalizado)
+    if consulta_catalogo("name"):
+        return jsonify([dict(row) for row in db.session.execute(
+            columnas.order_by(*sort_order(sort, Pokemon.id))).mappings()]), 200
+    pokemons = catalog_cache.get_or_set("pokemon:list", lambda: [
+        dict(row) for row in db.session.execute(columnas).mappings()], stamp=table_version_stamp())
+    return jsonify(pokemons), 200
+
+
+USER_FIELDS = ("id", "nombre", "favoritos")
+
+
+# los favoritos de cada usuario incluyen nombres de pokemon y pokeballs, asi que
+# el ETag depende de las cuatro tablas
+# ?fields=id,nombre elige las claves de cada usuario y ?expand=favoritos anade los favoritos;
+# sin favoritos es un solo SELECT de esas columnas y la relacion no se carga.
+# Sin ?fields la respuesta es la completa, con favoritos
 @app.route("/users", methods=["GET"])
+@conditional_get(lambda: table_versions("user", "favoritos", "pokemon", "pokeballs"))
 def get_usuario():
-    stmt = select(User)
-    users = db.session.execute(stmt).scalars().all()
-    return jsonify([user.serialize() for user in users]), 200
+    fields = parse_fields(request.args, "fields", USER_FIELDS)
+    expand = parse_fields(request.args, "expand", ("favoritos",)) or set()
+    rows = False
+    if fields is None:
+        stmt = select(User).options(USER_FAVORITOS_LOAD)
+        serializer = User.serialize
+    elif "favoritos" in fields | expand:
+        claves = [campo for campo in USER_FIELDS if campo in fields | expand]
+        stmt = select(User).options(USER_FAVORITOS_LOAD)
+
+        def serializer(user):
+            return {campo: valor for campo, valor in user.serialize().items() if campo in claves}
+    else:
+        # el id se lee siempre porque ordena y hace de cursor, aunque no se devuelva
+        claves = [campo for campo in USER_FIELDS if campo in fields]
+        stmt = select(*(columna for columna in User.serialized_columns() if columna.key in claves or columna.key == "id"))
+
+        def serializer(row):
+            return {campo: row._mapping[campo] for campo in claves}
+        rows = True
+
+    if wants_pagination(request.args):
+        return jsonify(keyset_paginate(db.session, stmt, User.id, request.args, serializer, rows=rows)), 200
+    fmt = stream_format(request.args)
+    if fmt:
+        return stream_rows(db.session, stmt.order_by(User.id), serializer, fmt, rows=rows)
+    result = db.session.execute(stmt)
+    users = result.all() if rows else result.scalars().all()
+    return jsonify([serializer(user) for user in users]), 200
+
+
+def ranking_select(model, nombre, limit=None):
+    # pokemon o pokeballs con favoritos ordenados por favorite_count (indexado); tambien lo usa asgi.py
+    stmt = (
+        select(model.id, nombre.label("nombre"), model.favorite_count)
+        .where(model.favorite_count > 0)
+        .order_by(model.favorite_count.desc(), model.id)
+    )
+    if limit is not None:
+        stmt = stmt.limit(parse_limit(limit))
+    return stmt
+
+
+def ranking_row(row, clave_nombre):
+    return {
+        "favorito_id": row.id,
+        clave_nombre: row.nombre,
+        "cantidad_veces_favorito": row.favorite_count
+    }
 
 
+# GET: ranking de pokemon favoritos, leido del contador favorite_count (indexado)
+# ?limit=N devuelve solo los N mas populares
 @app.route("/users/favoritos", methods=["GET"])
 def get_favorito():
-    stmt = select(Favoritos)
-    favoritos = db.session.execute(stmt).scalars().all()
-
-    pokemon_unicos = {}
-    # un diccionario no permite claves repetidas, asi que
-    # si encuentra una la sobreescribe a la que habia
-    for fav in favoritos:
-        if fav.pokemon.id in pokemon_unicos:
-            # Si ya está, aumentamos la cantidad
-            pokemon_unicos[fav.pokemon.id]["cantidad_veces_favorito"] += 1
-        else:
-            # Si no está, la inicializamos con cantidad 1
-            pokemon_unicos[fav.pokemon.id] = {
-                "favorito_id": fav.pokemon.id,
-                "pokemon_nombre": fav.pokemon.name,
-                "cantidad_veces_favorito": 1
-            }
-    return jsonify(list(pokemon_unicos.values())), 200
+    stmt = ranking_select(Pokemon, Pokemon.name, request.args.get("limit"))
+    return jsonify([ranking_row(row, "pokemon_nombre") for row in db.session.execute(stmt)]), 200
+
 
+# GET: lo mismo que /users/favoritos pero para las pokeballs
+@app.route("/users/favoritos/pokeballs", methods=["GET"])
+def get_favorito_pokeballs():
+    stmt = ranking_select(Pokeballs, Pokeballs.nombre, request.args.get("limit"))
+    return jsonify([ranking_row(row, "pokeballs_nombre") for row in db.session.execute(stmt)]), 200
 
+
+# mismos filtros que /pokemon sobre nombre: ?nombre= / ?nombre_prefix= / ?q= y ?sort=nombre|favorite_count
 @app.route("/pokeballs", methods=["GET"])
+@conditional_get(lambda: table_versions("pokeballs"))
 def get_pokeballs():
-    stmt = select(Pokeballs)
-    pokeballs = db.session.execute(stmt).scalars().all()
-    return jsonify([p.serialize() for p in pokeballs]), 200
+    sort = parse_sort(request.args, POKEBALLS_SORTS)
+    stmt = filtrar_nombre(select(Pokeballs), "nombre", Pokeballs.nombre, Pokeballs.nombre_normalizado)
+    if wants_pagination(request.args):
+        return jsonify(keyset_paginate(db.session, stmt, Pokeballs.id, request.args, Pokeballs.serialize, sort=sort)), 200
+    fmt = stream_format(request.args)
+    if fmt:
+        return stream_rows(db.session, stmt.order_by(*sort_order(sort, Pokeballs.id)), Pokeballs.serialize, fmt)
+    columnas = filtrar_nombre(
+        select(*Pokeballs.serialized_columns()), "nombre", Pokeballs.nombre, Pokeballs.nombre_normalizado)
+    if consulta_catalogo("nombre"):
+        return jsonify([dict(row) for row in db.session.execute(
+            columnas.order_by(*sort_order(sort, Pokeballs.id))).mappings()]), 200
+    pokeballs = catalog_cache.get_or_set("pokeballs:list", lambda: [
+        dict(row) for row in db.session.execute(columnas).mappings()], stamp=table_version_stamp())
+    return jsonify(pokeballs), 200
 
 
 # funcion get de un pokemon por su id
 @app.route("/pokeball/<int:id>", methods=["GET"])
+@conditional_get(lambda: table_versions("pokeballs"))
 def get_pokeballid(id):
-    stmt = select(Pokeballs).where(Pokeballs.id == id)
-    # Esto te da una lista de instancias de Pokemon
-    pokeball = db.session.execute(stmt).scalar_one_or_none()
+    stmt = select(*Pokeballs.serialized_columns()).where(Pokeballs.id == id)
+    pokeball = catalog_cache.get_or_set(f"pokeball:{id}", lambda: leer_dict(stmt), stamp=table_version_stamp())
     if pokeball is None:
         return jsonify({"error": "pokeball not found"}), 404
-    return jsonify(pokeball.serialize()), 200
+    return jsonify(pokeball), 200
+
+
+# GET /pokeball/batch?ids=1,2,3 o POST {"ids": [1, 2, 3]}: varias pokeballs con una sola query
+@app.route("/pokeball/batch", methods=["GET", "POST"])
+def get_pokeball_batch():
+    ids = parse_ids(request)
+    stmt = select(*Pokeballs.serialized_columns()).where(Pokeballs.id.in_(ids))
+    return jsonify(leer_por_ids(stmt, ids, lambda row: dict(row._mapping))), 200
 
 
 # eliminacion de un pokemon por su id
@@ -123,28 +290,108 @@ def delete_pokeball(id):
     db.session.delete(pokeball)
     # almacenamos cambios
     db.session.commit()
+    catalog_cache.invalidate("pokeballs:list", f"pokeball:{id}")
     return jsonify({"message": "pokeball deleted"}), 200
 
 
 @app.route("/favoritos/<int:id>", methods=["GET"])
 def get_onefavorito(id):
-    stmt = select(Favoritos).where(Favoritos.id == id)
-    # Esto te da una lista de instancias de Pokemon
-    favorito = db.session.execute(stmt).scalar_one_or_none()
+    # favorito con su pokemon o pokeball en una sola query con joins
+    stmt = Favoritos.serialized_select().where(Favoritos.id == id)
+    favorito = db.session.execute(stmt).one_or_none()
     if favorito is None:
         return jsonify({"error": "Pokemon not found"}), 404
-    return jsonify(favorito.serialize()), 200
+    return jsonify(Favoritos.serialize_row(favorito)), 200
+
+
+# GET /favoritos/batch?ids=1,2,3 o POST {"ids": [1, 2, 3]}
+@app.route("/favoritos/batch", methods=["GET", "POST"])
+def get_favoritos_batch():
+    ids = parse_ids(request)
+    stmt = Favoritos.serialized_select().where(Favoritos.id.in_(ids))
+    return jsonify(leer_por_ids(stmt, ids, Favoritos.serialize_row)), 200
 
 
 # GET ONE: Muestra un pokemon por su id
 @app.route("/pokemon/<int:id>", methods=["GET"])
+@conditional_get(lambda: table_versions("pokemon"))
 def get_pokemonone(id):
-    stmt = select(Pokemon).where(Pokemon.id == id)
-    # Esto te da una lista de instancias de Pokemon
-    pokemons = db.session.execute(stmt).scalar_one_or_none()
-    if pokemons is None:
+    stmt = select(*Pokemon.serialized_columns()).where(Pokemon.id == id)
+    pokemon = catalog_cache.get_or_set(f"pokemon:{id}", lambda: leer_dict(stmt), stamp=table_version_stamp())
+    if pokemon is None:
         return jsonify({"error": "Pokemon not found"}), 404
-    return jsonify(pokemons.serialize()), 200
+    return jsonify(pokemon), 200
+
+
+# GET /pokemon/batch?ids=1,2,3 o POST {"ids": [1, 2, 3]}: varios pokemon con una sola query
+@app.route("/pokemon/batch", methods=["GET", "POST"])
+def get_pokemon_batch():
+    ids = parse_ids(request)
+    stmt = select(*Pokemon.serialized_columns()).where(Pokemon.id.in_(ids))
+    return jsonify(leer_por_ids(stmt, ids, lambda row: dict(row._mapping))), 200
+
+
+def validar_usuario(item):
+    # devuelve el mensaje de error de un usuario mal formado, o None si esta bien
+    if not isinstance(item, dict) or "name" not in item or "favoritos" not in item:
+        return "Missing name or favoritos in one of the users"
+    if not isinstance(item["name"], str) or not item["name"].strip():
+        return "name must be a non empty string"
+    if not isinstance(item["favoritos"], list) or not all(
+            isinstance(poke_id, int) and not isinstance(poke_id, bool) for poke_id in item["favoritos"]):
+        return "favoritos must be a list of pokemon ids"
+    return None
+
+
+def validar_lote_usuarios(items):
+    """Valida un lote de usuarios y devuelve {indice: mensaje de error}.
+    Los nombres ya usados y los pokemon inexistentes se buscan con un IN por lote,
+    no con una query por usuario."""
+    errores = {}
+    for i, item in enumerate(items):
+        error = validar_usuario(item)
+        if error:
+            errores[i] = error
+    validos = [(i, item) for i, item in enumerate(items) if i not in errores]
+
+    nombres_usados = set()
+    for trozo in chunked({item["name"] for _, item in validos}):
+        nombres_usados.update(db.session.execute(
+            select(User.name).where(User.name.in_(trozo))).scalars())
+    pokemon_existentes = set()
+    for trozo in chunked({poke_id for _, item in validos for poke_id in item["favoritos"]}):
+        pokemon_existentes.update(db.session.execute(
+            select(Pokemon.id).where(Pokemon.id.in_(trozo))).scalars())
+
+    for i, item in validos:
+        faltan = set(item["favoritos"]) - pokemon_existentes
+        if item["name"] in nombres_usados:
+            errores[i] = f"User {item['name']} already exists"
+        elif faltan:
+            errores[i] = f"Pokemon not found: {sorted(faltan)}"
+        # un nombre repetido dentro del mismo lote tambien choca con el indice unico
+        nombres_usados.add(item["name"])
+    return errores
+
+
+def insertar_usuarios(items):
+    """Inserta usuarios ya validados y sus favoritos en bloque: un INSERT ... RETURNING
+    multi-fila para los usuarios y un executemany para los favoritos. Devuelve los ids nuevos."""
+    filas = db.session.execute(
+        insert(User).returning(User.id, User.name),
+        [{"name": item["name"]} for item in items]).all()
+    ids_por_nombre = {fila.name: fila.id for fila in filas}
+
+    # dict.fromkeys quita ids repetidos manteniendo el orden (indice unico user_id, pokemon_id)
+    favoritos = [
+        {"user_id": ids_por_nombre[item["name"]], "pokemon_id": poke_id}
+        for item in items
+        for poke_id in dict.fromkeys(item["favoritos"])
+    ]
+    if favoritos:
+        db.session.execute(insert(Favoritos), favoritos)
+    refresh_favorite_counts(pokemon_ids={f["pokemon_id"] for f in favoritos})
+    return [ids_por_nombre[item["name"]] for item in items]
 
 
 # para crear en postmat un nuevo user tiene que ir con algun favorito [
@@ -160,27 +407,79 @@ def create_users():
     if not data or not isinstance(data, list):
         return jsonify({"error": "Missing or invalid data, expected a list"}), 400
 
-    nuevos_usuarios = []
+    errores = validar_lote_usuarios(data)
+    if errores:
+        return jsonify({
+            "error": errores[min(errores)],
+            "errores": [{"index": i, "error": errores[i]} for i in sorted(errores)]
+        }), 400
 
-    for item in data:
-        if "name" not in item or "favoritos" not in item:
-            return jsonify({"error": "Missing name or favoritos in one of the users"}), 400
+    nuevos_ids = insertar_usuarios(data)
+    db.session.commit()
 
-        new_user = User(name=item["name"])
-        db.session.add(new_user)
-        db.session.flush()  # asigna ID a new_user para favoritos
+    nuevos_usuarios = []
+    for trozo in chunked(nuevos_ids):
+        nuevos_usuarios.extend(db.session.execute(
+            select(User).where(User.id.in_(trozo)).order_by(User.id)
+            .options(USER_FAVORITOS_LOAD)).scalars())
+    return jsonify([usuario.serialize() for usuario in nuevos_usuarios]), 201
 
-        favoritos_a_agregar = []
-        for poke_id in item["favoritos"]:
-            favorito = Favoritos(user_id=new_user.id, pokemon_id=poke_id)
-            favoritos_a_agregar.append(favorito)
 
-        nuevos_usuarios.append(new_user)
-        db.session.add_all(favoritos_a_agregar)
+def importar_trozo(lineas):
+    """Valida e inserta un trozo de lineas NDJSON [(numero, usuario o None, error o None)]
+    en su propia transaccion y devuelve el resumen del trozo."""
+    errores = {numero: error for numero, _, error in lineas if error}
+    filas = [(numero, item) for numero, item, error in lineas if not error]
+    errores_lote = validar_lote_usuarios([item for _, item in filas])
+    for i, error in errores_lote.items():
+        errores[filas[i][0]] = error
+    validos = [item for i, (_, item) in enumerate(filas) if i not in errores_lote]
+    try:
+        insertar_usuarios(validos)
+        db.session.commit()
+    except IntegrityError:
+        # otro proceso inserto el mismo nombre entre la validacion y el commit
+        db.session.rollback()
+        for numero, _ in filas:
+            errores.setdefault(numero, "Conflict while inserting this chunk")
+        validos = []
+    return {
+        "lineas": [lineas[0][0], lineas[-1][0]],
+        "insertados": len(validos),
+        "errores": [{"linea": numero, "error": errores[numero]} for numero in sorted(errores)]
+    }
 
-    db.session.commit()
 
-    return jsonify([usuario.serialize() for usuario in nuevos_usuarios]), 201
+# POST: importa usuarios en NDJSON (un usuario por linea, mismo formato que /createusers)
+# leyendo el body poco a poco y haciendo commit cada ?chunk_size= lineas (1000 por defecto)
+@app.route("/importusers", methods=["POST"])
+def import_users():
+    try:
+        chunk_size = int(request.args.get("chunk_size", 1000))
+    except ValueError:
+        raise APIException("chunk_size must be an integer", status_code=400)
+    if not 1 <= chunk_size <= 10000:
+        raise APIException("chunk_size must be between 1 and 10000", status_code=400)
+
+    trozos = []
+    lineas = []
+    for numero, linea in enumerate(request.stream, start=1):
+        if not linea.strip():
+            continue
+        try:
+            lineas.append((numero, json.loads(linea), None))
+        except ValueError:
+            lineas.append((numero, None, "Invalid JSON"))
+        if len(lineas) >= chunk_size:
+            trozos.append(importar_trozo(lineas))
+            lineas = []
+    if lineas:
+        trozos.append(importar_trozo(lineas))
+
+    return jsonify({
+        "insertados": sum(trozo["insertados"] for trozo in trozos),
+        "trozos": trozos
+    }), 200
 
 
 # POST: crea un nuevo pokemon favorito para un usuario dado
@@ -195,20 +494,23 @@ def create_poke_favorito(id):
     if usuario is None:
         return jsonify({"error": "Usuario no encontrado"}), 404
 
-    nombre_nuevo = data["name"].strip().lower()
-
-    # Comprobar si usuario ya tiene un favorito con ese nombre
-    existe_favorito = any(
-        favorito.pokemon.name.strip().lower() == nombre_nuevo
-        for favorito in usuario.favoritos
-    )
+    # Comprobar si usuario ya tiene un favorito con ese nombre (un solo EXISTS,
+    # resuelto con el indice de name_normalizado y el de favoritos)
+    existe_favorito = db.session.execute(select(
+        select(Favoritos.id)
+        .join(Pokemon, Favoritos.pokemon_id == Pokemon.id)
+        .where(Favoritos.user_id == usuario.id,
+               Pokemon.name_normalizado == normalizar_nombre(data["name"]))
+        .exists()
+    )).scalar()
     if existe_favorito:
         return jsonify({"error": "El usuario ya tiene un favorito con ese nombre"}), 409
 
     # Crear nuevo Pokémon
     new_pokemon = Pokemon(
         name=data["name"],
-        url=data["url"]
+        url=data["url"],
+        favorite_count=1
     )
     db.session.add(new_pokemon)
     db.session.flush()  # para asignar ID al nuevo Pokémon antes de crear Favoritos
@@ -222,8 +524,11 @@ def create_poke_favorito(id):
 
     # Guardar cambios en la base de datos
     db.session.commit()
+    catalog_cache.invalidate("pokemon:list")
 
     # Devolver usuario serializado con su lista de favoritos actualizada
+    usuario = db.session.execute(
+        select(User).where(User.id == id).options(USER_FAVORITOS_LOAD)).scalar_one()
     return jsonify({"usuario": usuario.serialize()}), 201
 
 
@@ -239,13 +544,15 @@ def create_pokeballs_favorito(id):
     if usuario is None:
         return jsonify({"error": "Usuario no encontrado"}), 404
 
-    nombre_nuevo = data["nombre"].strip().lower()
-
-    # Comprobar si usuario ya tiene un favorito con ese nombre
-    existe_favorito = any(
-        favorito.pokeballs and favorito.pokeballs.nombre.strip().lower() == nombre_nuevo
-        for favorito in usuario.favoritos
-    )
+    # Comprobar si usuario ya tiene un favorito con ese nombre (un solo EXISTS,
+    # resuelto con el indice de nombre_normalizado y el de favoritos)
+    existe_favorito = db.session.execute(select(
+        select(Favoritos.id)
+        .join(Pokeballs, Favoritos.pokeballs_id == Pokeballs.id)
+        .where(Favoritos.user_id == usuario.id,
+               Pokeballs.nombre_normalizado == normalizar_nombre(data["nombre"]))
+        .exists()
+    )).scalar()
     if existe_favorito:
         return jsonify({"error": "El usuario ya tiene un favorito con ese nombre"}), 409
 
@@ -253,8 +560,8 @@ def create_pokeballs_favorito(id):
     new_pokeballs = Pokeballs(
         nombre=data["nombre"],
         efectividad=data["efectividad"],
-        descripcion=data["descripcion"]
-
+        descripcion=data["descripcion"],
+        favorite_count=1
     )
     db.session.add(new_pokeballs)
     db.session.flush()  # para asignar ID al nuevo Pokémon antes de crear Favoritos
@@ -268,8 +575,11 @@ def create_pokeballs_favorito(id):
 
     # Guardar cambios en la base de datos
     db.session.commit()
+    catalog_cache.invalidate("pokeballs:list")
 
     # Devolver usuario serializado con su lista de favoritos actualizada
+    usuario = db.session.execute(
+        select(User).where(User.id == id).options(USER_FAVORITOS_LOAD)).scalar_one()
     return jsonify({"usuario": usuario.serialize()}), 201
 
 
@@ -291,6 +601,7 @@ def update_pokemon(id):
     pokemon.url = data.get("url", pokemon.url)
     # almacenamos las cambios
     db.session.commit()
+    catalog_cache.invalidate("pokemon:list", f"pokemon:{id}")
     return jsonify(pokemon.serialize()), 200
 
 
@@ -306,6 +617,7 @@ def delete_pokemon(id):
     db.session.delete(poke)
     # almacenamos cambios
     db.session.commit()
+    catalog_cache.invalidate("pokemon:list", f"pokemon:{id}")
     return jsonify({"message": "User deleted"}), 200
 
 
@@ -317,6 +629,13 @@ def delete_pokemonfavorito(id):
     favorito = db.session.execute(stmt).scalar_one_or_none()
     if favorito is None:
         return jsonify({"error": "favorito not found"}), 404
+    # restamos uno al contador del pokemon o pokeball que deja de ser favorito
+    if favorito.pokemon_id is not None:
+        db.session.execute(update(Pokemon).where(Pokemon.id == favorito.pokemon_id)
+                           .values(favorite_count=Pokemon.favorite_count - 1))
+    if favorito.pokeballs_id is not None:
+        db.session.execute(update(Pokeballs).where(Pokeballs.id == favorito.pokeballs_id)
+                           .values(favorite_count=Pokeballs.favorite_count - 1))
     # eliminamos favorito
     db.session.delete(favorito)
     # almacenamoss cambios
@@ -324,6 +643,122 @@ def delete_pokemonfavorito(id):
     return jsonify({"message": "favorito deleted"}), 200
 
 
+def borrar_catalogo(model, fk, ids):
+    """DELETE en bloque de pokemon o pokeballs: primero los favoritos que los apuntan y
+    luego las filas, dos sentencias en una transaccion. Devuelve cuantas filas borra cada una."""
+    favoritos = db.session.execute(delete(Favoritos).where(fk.in_(ids))).rowcount
+    borrados = db.session.execute(delete(model).where(model.id.in_(ids))).rowcount
+    db.session.commit()
+    return {"deleted": borrados, "favoritos_deleted": favoritos}
+
+
+# DELETE /pokemon/bulk {"ids": [1, 2, 3]}: borra varios pokemon y sus favoritos
+@app.route("/pokemon/bulk", methods=["DELETE"])
+def delete_pokemon_bulk():
+    ids = parse_ids(request, limit=MAX_BULK_IDS)
+    result = borrar_catalogo(Pokemon, Favoritos.pokemon_id, ids)
+    catalog_cache.invalidate("pokemon:list", *(f"pokemon:{id}" for id in ids))
+    return jsonify(result), 200
+
+
+# DELETE /pokeball/bulk {"ids": [1, 2, 3]}: borra varias pokeballs y sus favoritos
+@app.route("/pokeball/bulk", methods=["DELETE"])
+def delete_pokeball_bulk():
+    ids = parse_ids(request, limit=MAX_BULK_IDS)
+    result = borrar_catalogo(Pokeballs, Favoritos.pokeballs_id, ids)
+    catalog_cache.invalidate("pokeballs:list", *(f"pokeball:{id}" for id in ids))
+    return jsonify(result), 200
+
+
+# PUT /pokemon/bulk {"ids": [1, 2, 3], "name": "Pikachu"}: renombra varios pokemon con un
+# solo UPDATE ... WHERE id IN (...). La url es unica, asi que no se puede cambiar en bloque
+@app.route("/pokemon/bulk", methods=["PUT"])
+def update_pokemon_bulk():
+    ids = parse_ids(request, limit=MAX_BULK_IDS)
+    data = request.get_json()
+    name = data.get("name") if isinstance(data, dict) else None
+    if not isinstance(name, str) or not name.strip():
+        raise APIException("name is required", status_code=400)
+    result = db.session.execute(update(Pokemon).where(Pokemon.id.in_(ids)).values(
+        name=name, name_normalizado=normalizar_nombre(name)))
+    db.session.commit()
+    catalog_cache.invalidate("pokemon:list", *(f"pokemon:{id}" for id in ids))
+    return jsonify({"updated": result.rowcount}), 200
+
+
+# DELETE /favoritos/bulk {"ids": [...]} o un filtro {"user_id": 1}, {"pokemon_id": 4},
+# {"pokeballs_id": 2} (se pueden combinar): un DELETE ... RETURNING y se recalculan
+# los contadores de los pokemon y pokeballs afectados
+@app.route("/favoritos/bulk", methods=["DELETE"])
+def delete_favoritos_bulk():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        raise APIException('body must be {"ids": [...]} or a filter', status_code=400)
+    condiciones = []
+    if "ids" in data:
+        condiciones.append(Favoritos.id.in_(parse_ids(request, limit=MAX_BULK_IDS)))
+    for campo in ("user_id", "pokemon_id", "pokeballs_id"):
+        if campo in data:
+            if not isinstance(data[campo], int) or isinstance(data[campo], bool):
+                raise APIException(f"{campo} must be an integer", status_code=400)
+            condiciones.append(getattr(Favoritos, campo) == data[campo])
+    # sin ningun filtro se borraria la tabla entera
+    if not condiciones:
+        raise APIException("ids or a filter (user_id, pokemon_id, pokeballs_id) is required", status_code=400)
+
+    borrados = db.session.execute(
+        delete(Favoritos).where(*condiciones).returning(Favoritos.pokemon_id, Favoritos.pokeballs_id)).all()
+    refresh_favorite_counts(
+        pokemon_ids={fila.pokemon_id for fila in borrados if fila.pokemon_id is not None},
+        pokeball_ids={fila.pokeballs_id for fila in borrados if fila.pokeballs_id is not None})
+    db.session.commit()
+    return jsonify({"deleted": len(borrados)}), 200
+
+
+# GET: aciertos, fallos y expulsiones de la cache del catalogo
+@app.route("/cache/stats", methods=["GET"])
+def get_cache_stats():
+    return jsonify(catalog_cache.stats()), 200
+
+
+# GET: estado del pool de conexiones (en uso, libres, overflow y espera al pedir conexion)
+@app.route("/db/pool", methods=["GET"])
+def get_pool_stats():
+    return jsonify(pool_stats()), 200
+
+
+# flask recount-favoritos: recalcula favorite_count desde la tabla favoritos
+@app.cli.command("recount-favoritos")
+def recount_favoritos():
+    refresh_favorite_counts()
+    db.session.commit()
+    click.echo("favorite_count recalculado")
+
+
+# flask seed --favoritos 10000000: genera datos sinteticos a escala de produccion
+@app.cli.command("seed")
+@click.option("--users", default=10000, show_default=True)
+@click.option("--pokemon", default=1000, show_default=True)
+@click.option("--pokeballs", default=50, show_default=True)
+@click.option("--favoritos", default=100000, show_default=True, help="total de favoritos")
+@click.option("--seed", default=42, show_default=True, help="semilla (mismos datos con la misma semilla)")
+@click.option("--skew", default=1.1, show_default=True, help="exponente Zipf de la popularidad")
+@click.option("--power-users", default=1.5, show_default=True, help="alpha Pareto de favoritos por usuario")
+@click.option("--pokeball-ratio", default=0.1, show_default=True, help="fraccion de favoritos que son pokeballs")
+@click.option("--chunk-size", default=10000, show_default=True, help="filas por INSERT y por commit")
+@click.option("--reset", is_flag=True, help="vacia antes user, pokemon, pokeballs y favoritos")
+def seed(users, pokemon, pokeballs, favoritos, seed, skew, power_users, pokeball_ratio, chunk_size, reset):
+    try:
+        seed_database(users, pokemon, pokeballs, favoritos, seed=seed, skew=skew,
+                      power_users=power_users, pokeball_ratio=pokeball_ratio,
+                      chunk_size=chunk_size, reset=reset, log=click.echo)
+    except IntegrityError:
+        db.session.rollback()
+        raise click.ClickException("ya hay datos con esta semilla: usa --reset u otra --seed")
+    # lo que hubiera en la cache (si es la compartida) ya no corresponde con la base de datos
+    catalog_cache.clear()
+
+
 # this only runs if `$ python src/app.py` is executed
 if __name__ == '__main__':
     PORT = int(os.environ.get('PORT', 3000))
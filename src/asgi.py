@@ -0,0 +1,212 @@
+# Punto de entrada ASGI, alternativo a wsgi.py:
+#   uvicorn asgi:application --app-dir src
+# Las lecturas mas frecuentes (pokemon, pokeball y favorito por id, sus consultas por lotes
+# y los rankings de favoritos) se resuelven aqui con un engine asincrono (aiosqlite o asyncpg),
+# asi un solo proceso puede tener cientos de peticiones esperando a la base de datos.
+# El resto de rutas las sigue atendiendo la app Flask, en el pool de hilos del event loop.
+
+import os
+import re
+from urllib.parse import parse_qsl
+
+from asgiref.sync import ThreadSensitiveContext
+from asgiref.wsgi import WsgiToAsgi
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine
+from werkzeug.datastructures import MultiDict
+from werkzeug.http import parse_accept_header
+
+from app import app, catalog_cache, ranking_select, ranking_row, resultados_por_ids
+from compression import choose_encoding, compress
+from models import Pokemon, Pokeballs, Favoritos, TableVersion, async_database_url, async_engine_options, configure_sqlite
+from utils import APIException, parse_ids, version_stamp
+
+db_url = app.config["SQLALCHEMY_DATABASE_URI"]
+engine = create_async_engine(async_database_url(db_url), **async_engine_options(db_url))
+if engine.dialect.name == "sqlite" and engine.url.database not in (None, "", ":memory:"):
+    configure_sqlite(engine.sync_engine)
+
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", 1024))
+COMPRESS_LEVEL = int(os.environ.get("COMPRESS_LEVEL", 6))
+
+
+class Peticion:
+    """Lo que usan parse_ids y parse_limit de flask.Request: el metodo y la query string."""
+
+    def __init__(self, scope):
+        self.method = scope["method"]
+        # igual que request.args de werkzeug: UTF-8 y sin perder los valores vacios
+        # (?limit= tiene que dar el mismo 400 que en Flask)
+        self.args = MultiDict(parse_qsl(
+            scope["query_string"].decode(), keep_blank_values=True, errors="werkzeug.url_quote"))
+
+
+async def leer_dict(stmt):
+    async with engine.connect() as conn:
+        row = (await conn.execute(stmt)).mappings().one_or_none()
+    return dict(row) if row is not None else None
+
+
+async def leer_stamp(*tablas):
+    # las mismas versiones que conditional_get en app.py: una escritura en otro proceso
+    # cambia el stamp y la entrada de la cache de este deja de usarse
+    async with engine.connect() as conn:
+        rows = await conn.execute(
+            select(TableVersion.name, TableVersion.version).where(TableVersion.name.in_(tablas)))
+        versions = {name: 0 for name in tablas}
+        versions.update({row.name: row.version for row in rows})
+    return version_stamp(versions)
+
+
+async def leer_por_ids(stmt, ids, serializer):
+    async with engine.connect() as conn:
+        return resultados_por_ids(await conn.execute(stmt), ids, serializer)
+
+
+async def leer_ranking(stmt, clave_nombre):
+    async with engine.connect() as conn:
+        return [ranking_row(row, clave_nombre) for row in await conn.execute(stmt)]
+
+
+def parse_id(id):
+    """El id de la ruta como entero, o None si no lo es. Las claves de cache se construyen
+    con el entero para que /pokemon/001 y /pokemon/1 compartan entrada."""
+    try:
+        return int(id)
+    except ValueError:
+        return None
+
+
+# las vistas devuelven (status, cuerpo) con el mismo JSON que las de app.py
+
+async def get_pokemonone(peticion, id):
+    id = parse_id(id)
+    if id is None:
+        return 404, {"error": "Pokemon not found"}
+    stmt = select(*Pokemon.serialized_columns()).where(Pokemon.id == id)
+    pokemon = await catalog_cache.get_or_set_async(
+        f"pokemon:{id}", lambda: leer_dict(stmt), stamp=await leer_stamp("pokemon"))
+    if pokemon is None:
+        return 404, {"error": "Pokemon not found"}
+    return 200, pokemon
+
+
+async def get_pokeballid(peticion, id):
+    id = parse_id(id)
+    if id is None:
+        return 404, {"error": "pokeball not found"}
+    stmt = select(*Pokeballs.serialized_columns()).where(Pokeballs.id == id)
+    pokeball = await catalog_cache.get_or_set_async(
+        f"pokeball:{id}", lambda: leer_dict(stmt), stamp=await leer_stamp("pokeballs"))
+    if pokeball is None:
+        return 404, {"error": "pokeball not found"}
+    return 200, pokeball
+
+
+async def get_onefavorito(peticion, id):
+    async with engine.connect() as conn:
+        favorito = (await conn.execute(Favoritos.serialized_select().where(Favoritos.id == int(id)))).one_or_none()
+    if favorito is None:
+        return 404, {"error": "Pokemon not found"}
+    return 200, Favoritos.serialize_row(favorito)
+
+
+async def get_pokemon_batch(peticion):
+    ids = parse_ids(peticion)
+    stmt = select(*Pokemon.serialized_columns()).where(Pokemon.id.in_(ids))
+    return 200, await leer_por_ids(stmt, ids, lambda row: dict(row._mapping))
+
+
+async def get_pokeball_batch(peticion):
+    ids = parse_ids(peticion)
+    stmt = select(*Pokeballs.serialized_columns()).where(Pokeballs.id.in_(ids))
+    return 200, await leer_por_ids(stmt, ids, lambda row: dict(row._mapping))
+
+
+async def get_favoritos_batch(peticion):
+    ids = parse_ids(peticion)
+    stmt = Favoritos.serialized_select().where(Favoritos.id.in_(ids))
+    return 200, await leer_por_ids(stmt, ids, Favoritos.serialize_row)
+
+
+async def get_favorito(peticion):
+    stmt = ranking_select(Pokemon, Pokemon.name, peticion.args.get("limit"))
+    return 200, await leer_ranking(stmt, "pokemon_nombre")
+
+
+async def get_favorito_pokeballs(peticion):
+    stmt = ranking_select(Pokeballs, Pokeballs.nombre, peticion.args.get("limit"))
+    return 200, await leer_ranking(stmt, "pokeballs_nombre")
+
+
+# solo GET; las rutas que no estan aqui (o con otro metodo) van a Flask
+RUTAS = [
+    (re.compile(r"/pokemon/(\d+)"), get_pokemonone),
+    (re.compile(r"/pokeball/(\d+)"), get_pokeballid),
+    (re.compile(r"/favoritos/(\d+)"), get_onefavorito),
+    (re.compile(r"/pokemon/batch"), get_pokemon_batch),
+    (re.compile(r"/pokeball/batch"), get_pokeball_batch),
+    (re.compile(r"/favoritos/batch"), get_favoritos_batch),
+    (re.compile(r"/users/favoritos"), get_favorito),
+    (re.compile(r"/users/favoritos/pokeballs"), get_favorito_pokeballs),
+]
+
+
+# WsgiToAsgi ejecuta la app WSGI con thread_sensitive=True: sin mas, todas las peticiones
+# que van a Flask compartirian un solo hilo. Con un ThreadSensitiveContext por peticion
+# cada una tiene el suyo, y Flask puede atender varias a la vez
+flask_asgi = WsgiToAsgi(app)
+
+
+async def responder(scope, send, status, body):
+    data = app.json.dumps(body).encode()
+    cabeceras = dict(scope["headers"])
+    # lo mismo que CORS(app) con sus opciones por defecto: cualquier origen, y si la
+    # peticion trae Origin se devuelve ese mismo con Vary: Origin
+    origin = cabeceras.get(b"origin")
+    headers = [(b"content-type", b"application/json"), (b"access-control-allow-origin", origin or b"*")]
+    vary = [b"Origin"] if origin is not None else []
+    # misma compresion que setup_compression para las respuestas que no pasan por Flask
+    accept = cabeceras.get(b"accept-encoding", b"").decode("latin-1")
+    encoding = choose_encoding(parse_accept_header(accept)) if 200 <= status < 300 else None
+    if encoding is not None and len(data) >= COMPRESS_MIN_SIZE:
+        data = compress(data, encoding, COMPRESS_LEVEL)
+        headers.append((b"content-encoding", encoding.encode()))
+        vary.append(b"Accept-Encoding")
+    if vary:
+        headers.append((b"vary", b", ".join(vary)))
+    headers.append((b"content-length", str(len(data)).encode()))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": data})
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await engine.dispose()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] == "http" and scope["method"] == "GET":
+        # igual que app.url_map.strict_slashes = False
+        path = scope["path"].rstrip("/") or "/"
+        for ruta, vista in RUTAS:
+            match = ruta.fullmatch(path)
+            if match is None:
+                continue
+            try:
+                status, body = await vista(Peticion(scope), *match.groups())
+            except APIException as error:
+                status, body = error.status_code, error.to_dict()
+            await responder(scope, send, status, body)
+            return
+    async with ThreadSensitiveContext():
+        await flask_asgi(scope, receive, send)
@@ -0,0 +1,255 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheBackend:
+    """Interfaz comun de los backends de cache. Ademas de guardar valores, cada
+    backend guarda un numero de version por clave: invalidar una clave es subir
+    su version, y los valores se guardan bajo "clave@version".
+    blocking_io indica si get/set hacen I/O que no debe correr en el event loop."""
+
+    blocking_io = False
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value):
+        raise NotImplementedError
+
+    def delete(self, *keys):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def get_version(self, key):
+        raise NotImplementedError
+
+    def bump_version(self, *keys):
+        raise NotImplementedError
+
+    def stats(self):
+        raise NotImplementedError
+
+    def _versioned_key(self, key, stamp):
+        # stamp (opcional) es una version externa, p.ej. la de las tablas en la base de datos
+        versioned_key = f"{key}@{self.get_version(key)}"
+        return versioned_key if stamp is None else f"{versioned_key}#{stamp}"
+
+    def get_or_set(self, key, loader, stamp=None):
+        # la version se lee antes de cargar: si otro proceso invalida mientras tanto,
+        # el valor viejo queda guardado bajo una version que ya nadie pide
+        versioned_key = self._versioned_key(key, stamp)
+        value = self.get(versioned_key)
+        if value is None:
+            value = loader()
+            # si el loader devuelve None (p.ej. un 404) no se guarda nada
+            if value is not None:
+                self.set(versioned_key, value)
+        return value
+
+    async def _call(self, funcion, *args):
+        # el I/O bloqueante (SQLiteCache) va a un hilo para no parar el event loop
+        if self.blocking_io:
+            return await asyncio.to_thread(funcion, *args)
+        return funcion(*args)
+
+    async def get_or_set_async(self, key, loader, stamp=None):
+        # igual que get_or_set pero con un loader asincrono (asgi.py)
+        versioned_key = await self._call(self._versioned_key, key, stamp)
+        value = await self._call(self.get, versioned_key)
+        if value is None:
+            value = await loader()
+            if value is not None:
+                await self._call(self.set, versioned_key, value)
+        return value
+
+    def invalidate(self, *keys):
+        # subimos la version y borramos lo guardado con la anterior para no ocupar sitio
+        anteriores = [f"{key}@{self.get_version(key)}" for key in keys]
+        self.bump_version(*keys)
+        self.delete(*anteriores)
+
+
+class LRUCache(CacheBackend):
+    """Cache en memoria del proceso con limite de entradas (LRU) y caducidad (TTL).
+    Cuenta aciertos, fallos y expulsiones para poder dimensionarla.
+    Las versiones tambien tienen limite (maxsize claves): se guardan las ultimas invalidadas."""
+
+    def __init__(self, maxsize=256, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        # clave -> version, en orden de invalidacion; cada bump_version usa un numero nuevo
+        # de _ultima_version, asi que la primera clave es siempre la de version mas baja
+        self._versions = OrderedDict()
+        self._ultima_version = 0
+        # version de las claves que no estan en _versions. Al sacar una clave pasa a tener
+        # esta version, que no es menor que la que tenia: sus valores viejos no vuelven
+        # (a lo sumo, las claves nunca invalidadas pierden lo que tenian en cache)
+        self._version_base = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def get_version(self, key):
+        return self._versions.get(key, self._version_base)
+
+    def bump_version(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._ultima_version += 1
+                self._versions[key] = self._ultima_version
+                self._versions.move_to_end(key)
+            while len(self._versions) > self.maxsize:
+                # get_version no usa el lock: primero la base y luego se quita la clave
+                key, self._version_base = next(iter(self._versions.items()))
+                del self._versions[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": "memory",
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl
+            }
+
+
+class SQLiteCache(CacheBackend):
+    """Cache compartida entre los workers de gunicorn de una misma maquina, guardada
+    en un fichero SQLite local (sin servicios de red). Valores en JSON, con TTL y
+    limite de entradas; al pasarse del limite se expulsan las mas antiguas.
+    Los contadores de aciertos/fallos son de cada proceso."""
+
+    blocking_io = True
+
+    def __init__(self, path, maxsize=4096, ttl=300):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _conn(self):
+        # una conexion por hilo y por proceso (gunicorn hace fork despues de importar la app)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL, stored REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_stored ON cache (stored)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS versions (key TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires >= ?", (key, time.time())).fetchone()
+        if row is None:
+            self._count("misses")
+            return None
+        self._count("hits")
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires, stored) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), now + self.ttl, now))
+        # limpiamos lo caducado y, si seguimos por encima del limite, lo mas antiguo
+        conn.execute("DELETE FROM cache WHERE expires < ?", (now,))
+        sobran = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.maxsize
+        if sobran > 0:
+            conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY stored LIMIT ?)", (sobran,))
+            with self._lock:
+                self.evictions += sobran
+
+    def delete(self, *keys):
+        self._conn().executemany("DELETE FROM cache WHERE key = ?", [(key,) for key in keys])
+
+    def clear(self):
+        self._conn().execute("DELETE FROM cache")
+
+    def get_version(self, key):
+        row = self._conn().execute("SELECT version FROM versions WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def bump_version(self, *keys):
+        self._conn().executemany(
+            "INSERT INTO versions (key, version) VALUES (?, 1) "
+            "ON CONFLICT(key) DO UPDATE SET version = version + 1", [(key,) for key in keys])
+
+    def stats(self):
+        size = self._conn().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": size,
+            "maxsize": self.maxsize,
+            "ttl": self.ttl
+        }
+
+
+def create_cache(backend, maxsize, ttl, path=None):
+    # CACHE_BACKEND=memory (por defecto, una cache por worker) o sqlite (compartida)
+    if backend == "memory":
+        return LRUCache(maxsize=maxsize, ttl=ttl)
+    if backend == "sqlite":
+        return SQLiteCache(path or "/tmp/api-cache.sqlite", maxsize=maxsize, ttl=ttl)
+    raise ValueError(f"Unknown cache backend: {backend}")
@@ -0,0 +1,66 @@
+import os
+import zlib
+from flask import request
+
+COMPRESSIBLE_MIMETYPES = ("application/json", "application/x-ndjson", "text/html", "text/plain")
+
+
+def _compressor(encoding, level):
+    # wbits 16+ -> cabecera gzip, wbits positivo -> deflate (zlib)
+    wbits = 16 + zlib.MAX_WBITS if encoding == "gzip" else zlib.MAX_WBITS
+    return zlib.compressobj(level, zlib.DEFLATED, wbits)
+
+
+def compress(data, encoding, level):
+    compressor = _compressor(encoding, level)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _stream(iterable, compressor):
+    for chunk in iterable:
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def choose_encoding(accept_encodings):
+    # gzip si el cliente lo acepta, si no deflate, si no nada
+    for encoding in ("gzip", "deflate"):
+        if accept_encodings[encoding]:
+            return encoding
+    return None
+
+
+def setup_compression(app):
+    """Comprime con gzip o deflate (segun Accept-Encoding) las respuestas de texto de
+    al menos COMPRESS_MIN_SIZE bytes, y tambien las respuestas en streaming."""
+    min_size = int(os.environ.get("COMPRESS_MIN_SIZE", 1024))
+    level = int(os.environ.get("COMPRESS_LEVEL", 6))
+
+    @app.after_request
+    def compress_response(response):
+        comprimible = 200 <= response.status_code < 300 and response.mimetype in COMPRESSIBLE_MIMETYPES
+        if not comprimible or "Content-Encoding" in response.headers:
+            return response
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = _stream(response.response, _compressor(encoding, level))
+            response.headers.pop("Content-Length", None)
+        else:
+            if response.content_length is not None and response.content_length < min_size:
+                return response
+            response.set_data(compress(response.get_data(), encoding, level))
+
+        response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        # la representacion comprimida es otra: el ETag fuerte tiene que ser distinto
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f"{etag}-{encoding}", weak=weak)
+        return response
@@ -0,0 +1,96 @@
+import os
+import threading
+import time
+from flask import g, has_request_context, jsonify, request
+from sqlalchemy import event
+
+
+class QueryStats:
+    """Acumula por endpoint cuantas peticiones hubo, cuantas sentencias SQL lanzaron
+    y cuanto tiempo pasaron en la base de datos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, queries, db_time):
+        with self._lock:
+            stats = self._endpoints.setdefault(
+                endpoint, {"requests": 0, "queries": 0, "db_time_ms": 0.0, "max_queries": 0})
+            stats["requests"] += 1
+            stats["queries"] += queries
+            stats["db_time_ms"] += db_time * 1000
+            stats["max_queries"] = max(stats["max_queries"], queries)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                endpoint: dict(
+                    stats,
+                    db_time_ms=round(stats["db_time_ms"], 3),
+                    avg_queries=round(stats["queries"] / stats["requests"], 2),
+                    avg_db_time_ms=round(stats["db_time_ms"] / stats["requests"], 3))
+                for endpoint, stats in self._endpoints.items()
+            }
+
+
+def setup_query_stats(app, db):
+    """Cuenta las sentencias SQL y el tiempo en base de datos de cada peticion con
+    eventos de SQLAlchemy. Lo devuelve en la cabecera Server-Timing (salvo en las
+    respuestas en streaming), lo acumula por endpoint en GET /db/stats y registra en
+    el log las queries que tarden mas de SLOW_QUERY_MS milisegundos (200 por defecto)."""
+    slow_query = float(os.environ.get("SLOW_QUERY_MS", 200)) / 1000
+    query_stats = QueryStats()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        if has_request_context():
+            g.db_queries = g.get("db_queries", 0) + 1
+            g.db_time = g.get("db_time", 0.0) + elapsed
+        if elapsed >= slow_query:
+            app.logger.warning("Slow query (%.1f ms) on %s: %s", elapsed * 1000,
+                               request.path if has_request_context() else "-", statement)
+
+    def handle_error(exception_context):
+        # si la sentencia falla no hay after_cursor_execute: quitamos su inicio de la pila
+        # (sin cursor el error fue antes de before_cursor_execute y no hay nada que quitar)
+        conn = exception_context.connection
+        cursor = getattr(exception_context.execution_context, "cursor", None)
+        if conn is not None and cursor is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
+
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(db.engine, "after_cursor_execute", after_cursor_execute)
+        event.listen(db.engine, "handle_error", handle_error)
+
+    @app.before_request
+    def reset_query_stats():
+        g.db_queries = 0
+        g.db_time = 0.0
+
+    @app.after_request
+    def add_server_timing(response):
+        endpoint = request.endpoint or "404"
+        if response.is_streamed:
+            # las queries del cuerpo se lanzan mientras se envia, despues de las cabeceras:
+            # se apuntan al cerrar la respuesta y no se manda Server-Timing (seria parcial)
+            contexto = g._get_current_object()
+            response.call_on_close(lambda: query_stats.record(
+                endpoint, contexto.get("db_queries", 0), contexto.get("db_time", 0.0)))
+            return response
+        queries = g.get("db_queries", 0)
+        db_time = g.get("db_time", 0.0)
+        query_stats.record(endpoint, queries, db_time)
+        response.headers.add(
+            "Server-Timing", f'db;dur={db_time * 1000:.2f};desc="{queries} queries"')
+        return response
+
+    @app.route("/db/stats", methods=["GET"])
+    def get_query_stats():
+        return jsonify(query_stats.snapshot()), 200
+
+    return query_stats
@@ -0,0 +1,54 @@
+import os
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional, sin el se usa el json de la libreria estandar
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Proveedor JSON de la app que usa orjson cuando esta instalado y, si no, el
+    encoder estandar de Flask. JSON_ENCODER=stdlib fuerza el estandar.
+    Fechas, Decimal, UUID y dataclasses siguen pasando por default() para que
+    se serialicen igual con los dos encoders. El JSON es equivalente pero no
+    identico byte a byte: orjson escribe el texto no ASCII en UTF-8 ("ñ") y Flask
+    lo escapa ("\\u00f1")."""
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.encoder = os.getenv("JSON_ENCODER", "orjson" if orjson else "stdlib")
+        if self.encoder == "orjson" and orjson is None:
+            raise RuntimeError("JSON_ENCODER=orjson but orjson is not installed")
+        if self.encoder not in ("orjson", "stdlib"):
+            raise ValueError(f"Unknown JSON_ENCODER: {self.encoder}")
+
+    def _orjson_options(self):
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return options
+
+    def _use_orjson(self, indent=None):
+        # con indentacion (modo debug) dejamos el formato de Flask
+        return self.encoder == "orjson" and indent is None
+
+    def dumps(self, obj, **kwargs):
+        if not self._use_orjson(kwargs.get("indent")):
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._orjson_options()).decode()
+
+    def loads(self, s, **kwargs):
+        if not self._use_orjson() or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+        if pretty or not self._use_orjson():
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        # orjson devuelve bytes: se pasan tal cual a la respuesta sin pasar por str
+        body = orjson.dumps(obj, default=self.default,
+                            option=self._orjson_options() | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
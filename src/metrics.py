@@ -0,0 +1,77 @@
+import os
+import time
+from flask import Response, g, request
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge,
+                               Histogram, generate_latest, multiprocess)
+from models import pool_stats
+
+# con PROMETHEUS_MULTIPROC_DIR (lo prepara gunicorn.conf.py) cada worker escribe sus
+# metricas en ficheros de ese directorio y /metrics suma las de todos los workers
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+REQUESTS = Counter(
+    "http_requests_total", "Peticiones HTTP por ruta, metodo y codigo de estado",
+    ["method", "endpoint", "status"])
+LATENCY = Histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP",
+    ["method", "endpoint"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "Tamano del cuerpo de las respuestas",
+    ["method", "endpoint"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216))
+IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Peticiones en curso", multiprocess_mode="livesum")
+POOL = Gauge(
+    "db_pool_connections", "Conexiones del pool por estado (size, checked_out, checked_in, overflow)",
+    ["state"], multiprocess_mode="livesum")
+POOL_WAIT = Gauge(
+    "db_pool_checkout_wait_max_seconds", "Espera maxima para conseguir una conexion del pool",
+    multiprocess_mode="max")
+
+
+def _endpoint():
+    # la plantilla de la ruta (/pokemon/<int:id>) y no la URL, para no crear una serie por id
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+def setup_metrics(app, db):
+    """Expone en GET /metrics (formato Prometheus) peticiones, codigos de estado,
+    latencias, tamanos de respuesta, peticiones en curso y el estado del pool de conexiones."""
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_start = time.perf_counter()
+        g.metrics_in_flight = True
+        IN_FLIGHT.inc()
+
+    @app.after_request
+    def record_request_metrics(response):
+        start = g.pop("metrics_start", None)
+        if start is None:
+            return response
+        endpoint = _endpoint()
+        LATENCY.labels(request.method, endpoint).observe(time.perf_counter() - start)
+        REQUESTS.labels(request.method, endpoint, str(response.status_code)).inc()
+        if response.content_length is not None:
+            RESPONSE_SIZE.labels(request.method, endpoint).observe(response.content_length)
+        return response
+
+    @app.teardown_request
+    def finish_request_metrics(exc):
+        if g.pop("metrics_in_flight", False):
+            IN_FLIGHT.dec()
+        stats = pool_stats()
+        for state in ("size", "checked_out", "checked_in", "overflow"):
+            if state in stats:
+                POOL.labels(state).set(stats[state])
+        if "wait_max_ms" in stats:
+            POOL_WAIT.set(stats["wait_max_ms"] / 1000)
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        registry = REGISTRY
+        if MULTIPROCESS:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
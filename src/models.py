@@ -1,11 +1,167 @@
 
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import String, Boolean, Integer, ForeignKey
-from sqlalchemy.orm import Mapped, mapped_column,  relationship
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from itertools import chain
+from sqlalchemy import String, Boolean, Integer, DateTime, ForeignKey, Index, DDL, event, select, insert, update, func, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Mapped, Session, mapped_column,  relationship, validates
+from sqlalchemy.pool import QueuePool
 from collections import OrderedDict
+from utils import chunked
 db = SQLAlchemy()
 
 
+class TimedQueuePool(QueuePool):
+    """QueuePool que ademas mide cuanto tarda cada checkout (esperar a que se libere
+    una conexion o abrir una nueva) y cuantas veces se agota el pool_timeout."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            wait = time.perf_counter() - start
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_total += wait
+                self.wait_max = max(self.wait_max, wait)
+
+
+def _pool_options(url, pool_size, max_overflow):
+    """Opciones de pool comunes a los dos engines: DB_POOL_TIMEOUT, DB_POOL_RECYCLE y
+    DB_POOL_PRE_PING. None si la URL es SQLite en memoria (StaticPool, sin pool que ajustar)."""
+    parsed = make_url(url)
+    if parsed.drivername.startswith("sqlite") and parsed.database in (None, "", ":memory:"):
+        return None
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes"),
+    }
+
+
+def _sync_pool_size():
+    return int(os.getenv("DB_POOL_SIZE", 5)), int(os.getenv("DB_MAX_OVERFLOW", 10))
+
+
+def engine_options(url):
+    """Opciones del engine a partir de variables de entorno, para ajustar el pool
+    al numero de workers de gunicorn y al max_connections de Postgres:
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE y DB_POOL_PRE_PING."""
+    options = _pool_options(url, *_sync_pool_size())
+    if options is None:
+        return {}
+    return {"poolclass": TimedQueuePool, **options}
+
+
+# driver asincrono para cada base de datos (el resto de la URL no cambia)
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def async_database_url(url):
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver for {backend} databases")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend])
+
+
+def async_engine_options(url):
+    """Como engine_options pero para el engine de asgi.py, con su propio tamano
+    (ASYNC_DB_POOL_SIZE y ASYNC_DB_MAX_OVERFLOW). Ese proceso tiene tambien el pool de
+    Flask, asi que con DB_MAX_CONNECTIONS (conexiones por proceso) el asincrono se queda
+    con lo que no usa el sincrono y entre los dos nunca pasan de ese limite."""
+    pool_size = int(os.getenv("ASYNC_DB_POOL_SIZE", 10))
+    max_overflow = int(os.getenv("ASYNC_DB_MAX_OVERFLOW", 20))
+    limite = os.getenv("DB_MAX_CONNECTIONS")
+    if limite is not None:
+        disponibles = int(limite) - sum(_sync_pool_size())
+        if disponibles < 1:
+            raise ValueError(f"DB_MAX_CONNECTIONS={limite} leaves no connections for the async pool")
+        pool_size = min(pool_size, disponibles)
+        max_overflow = min(max_overflow, disponibles - pool_size)
+    return _pool_options(url, pool_size, max_overflow) or {}
+
+
+def configure_sqlite(engine):
+    """Pragmas para usar SQLite con varios workers: WAL deja leer mientras otro escribe,
+    synchronous=NORMAL es seguro con WAL y evita un fsync por commit, y busy_timeout
+    hace esperar al escritor en vez de fallar con "database is locked".
+    Se puede ajustar con SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS, SQLITE_BUSY_TIMEOUT (ms),
+    SQLITE_MMAP_SIZE (bytes) y SQLITE_CACHE_SIZE (negativo = KiB)."""
+    pragmas = (
+        ("journal_mode", os.getenv("SQLITE_JOURNAL_MODE", "WAL")),
+        ("synchronous", os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")),
+        ("busy_timeout", int(os.getenv("SQLITE_BUSY_TIMEOUT", 5000))),
+        ("mmap_size", int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))),
+        ("cache_size", int(os.getenv("SQLITE_CACHE_SIZE", -64000))),
+        ("temp_store", "MEMORY"),
+    )
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas:
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def normalizar_nombre(nombre):
+    # minusculas y sin espacios alrededor, en Python: igual en SQLite que en Postgres
+    return nombre.strip().lower()
+
+
+# tipo de las columnas normalizadas: en Postgres con COLLATE "C" (orden por codigo, como
+# BINARY en SQLite) para que el indice sirva al rango de ?name_prefix= y a ?sort=name
+# sin depender del locale de la base de datos
+NombreNormalizado = String(100).with_variant(String(100, collation="C"), "postgresql")
+
+
+def _normalizado_de(columna):
+    # default de name_normalizado / nombre_normalizado en los INSERT sin ORM (seed.py)
+    return lambda context: normalizar_nombre(context.get_current_parameters()[columna])
+
+
+def pool_stats():
+    pool = db.engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"pool": type(pool).__name__, "status": pool.status()}
+    stats = {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+    }
+    if isinstance(pool, TimedQueuePool):
+        with pool._stats_lock:
+            stats.update({
+                "checkouts": pool.checkouts,
+                "timeouts": pool.timeouts,
+                "wait_avg_ms": round(pool.wait_total / pool.checkouts * 1000, 3) if pool.checkouts else 0.0,
+                "wait_max_ms": round(pool.wait_max * 1000, 3),
+            })
+    return stats
+
+
 class User(db.Model):
     __tablename__ = "user"
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -35,16 +191,32 @@ class User(db.Model):
             ]
         }
 
+    @classmethod
+    def serialized_columns(cls):
+        # claves de serialize() que son columnas (sin favoritos)
+        return (cls.id, cls.name.label("nombre"))
+
 
 class Pokemon(db.Model):
     __tablename__ = "pokemon"
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(100))
     url: Mapped[str] = mapped_column(String(50), unique=True, nullable=False)
+    # name normalizado (normalizar_nombre), se guarda al escribir: lo usan la busqueda de
+    # favoritos repetidos y los filtros ?name= / ?name_prefix= y ?sort=name de /pokemon
+    name_normalizado: Mapped[str] = mapped_column(NombreNormalizado, index=True, default=_normalizado_de("name"))
+    # contador desnormalizado de cuantas veces es favorito, se mantiene al escribir
+    favorite_count: Mapped[int] = mapped_column(
+        Integer, default=0, server_default="0", nullable=False, index=True)
 
     favoritos: Mapped[list["Favoritos"]] = relationship(
         "Favoritos", back_populates="pokemon")
 
+    @validates("name")
+    def _normalizar_name(self, key, name):
+        self.name_normalizado = normalizar_nombre(name)
+        return name
+
     def serialize(self):
         return {
             "id": self.id,
@@ -52,6 +224,17 @@ class Pokemon(db.Model):
             "url": self.url
         }
 
+    @classmethod
+    def serialized_columns(cls):
+        # mismas claves que serialize(), para leer filas sin crear objetos ORM
+        return (cls.id, cls.name, cls.url)
+
+
+# en Postgres, indice de trigramas para ?q= (name ILIKE '%...%')
+Index("ix_pokemon_name_trgm", Pokemon.name,
+      postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}).ddl_if(dialect="postgresql")
+
+
 # Son algo asi como las armas para capturar pokemon
 class Pokeballs(db.Model):
     __tablename__ = "pokeballs"
@@ -60,10 +243,18 @@ class Pokeballs(db.Model):
     efectividad: Mapped[int] = mapped_column(Integer)
     descripcion: Mapped[str] = mapped_column(
         String(100), unique=True, nullable=False)
+    nombre_normalizado: Mapped[str] = mapped_column(NombreNormalizado, index=True, default=_normalizado_de("nombre"))
+    favorite_count: Mapped[int] = mapped_column(
+        Integer, default=0, server_default="0", nullable=False, index=True)
 
     favoritos: Mapped[list["Favoritos"]] = relationship(
         "Favoritos", back_populates="pokeballs")
 
+    @validates("nombre")
+    def _normalizar_nombre(self, key, nombre):
+        self.nombre_normalizado = normalizar_nombre(nombre)
+        return nombre
+
     def serialize(self):
         return {
             "id": self.id,
@@ -72,15 +263,39 @@ class Pokeballs(db.Model):
             "descripcion": self.descripcion
         }
 
+    @classmethod
+    def serialized_columns(cls):
+        return (cls.id, cls.nombre, cls.efectividad, cls.descripcion)
+
+
+Index("ix_pokeballs_nombre_trgm", Pokeballs.nombre,
+      postgresql_using="gin", postgresql_ops={"nombre": "gin_trgm_ops"}).ddl_if(dialect="postgresql")
+
+# los indices de trigramas necesitan la extension pg_trgm (db.create_all en Postgres)
+for _table in (Pokemon.__table__, Pokeballs.__table__):
+    event.listen(_table, "before_create",
+                 DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"))
+
 
 class Favoritos(db.Model):
     __tablename__ = "favoritos"
+    # un usuario no puede tener el mismo pokemon (o pokeball) dos veces como favorito;
+    # son indices parciales porque cada fila solo rellena una de las dos columnas
+    __table_args__ = (
+        Index("uq_favoritos_user_pokemon", "user_id", "pokemon_id", unique=True,
+              postgresql_where=text("pokemon_id IS NOT NULL"),
+              sqlite_where=text("pokemon_id IS NOT NULL")),
+        Index("uq_favoritos_user_pokeballs", "user_id", "pokeballs_id", unique=True,
+              postgresql_where=text("pokeballs_id IS NOT NULL"),
+              sqlite_where=text("pokeballs_id IS NOT NULL")),
+    )
     id: Mapped[int] = mapped_column(primary_key=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey("user.id"), nullable=False)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("user.id"), nullable=False, index=True)
     pokemon_id: Mapped[int] = mapped_column(
-        ForeignKey("pokemon.id"), nullable=True)
+        ForeignKey("pokemon.id"), nullable=True, index=True)
     pokeballs_id: Mapped[int] = mapped_column(
-        ForeignKey("pokeballs.id"), nullable=True)
+        ForeignKey("pokeballs.id"), nullable=True, index=True)
 
     usuario: Mapped["User"] = relationship("User", back_populates="favoritos")
     pokemon: Mapped["Pokemon"] = relationship(
@@ -107,3 +322,115 @@ class Favoritos(db.Model):
             return {
                 "tipo": "desconocido"
             }
+
+    @staticmethod
+    def serialized_select():
+        # una sola query con las columnas que necesita serialize_row()
+        return (
+            select(Favoritos.id,
+                   Pokemon.id.label("pokemon_id"), Pokemon.name, Pokemon.url,
+                   Pokeballs.id.label("pokeballs_id"), Pokeballs.nombre, Pokeballs.efectividad)
+            .outerjoin(Pokemon, Favoritos.pokemon_id == Pokemon.id)
+            .outerjoin(Pokeballs, Favoritos.pokeballs_id == Pokeballs.id)
+        )
+
+    @staticmethod
+    def serialize_row(row):
+        # igual que serialize() pero a partir de una fila de serialized_select()
+        if row.pokemon_id is not None:
+            return {
+                "tipo": "pokemon",
+                "id": row.pokemon_id,
+                "nombre": row.name,
+                "url": row.url
+            }
+        elif row.pokeballs_id is not None:
+            return {
+                "tipo": "pokeball",
+                "id": row.pokeballs_id,
+                "nombre": row.nombre,
+                "efectividad": row.efectividad,
+            }
+        else:
+            return {
+                "tipo": "desconocido"
+            }
+
+
+def refresh_favorite_counts(pokemon_ids=None, pokeball_ids=None):
+    """Recalcula favorite_count desde la tabla favoritos para los ids dados.
+    Sin ningun id (ni de pokemon ni de pokeballs) recalcula todas las filas."""
+    todas = pokemon_ids is None and pokeball_ids is None
+    for model, fk, ids in ((Pokemon, Favoritos.pokemon_id, pokemon_ids),
+                           (Pokeballs, Favoritos.pokeballs_id, pokeball_ids)):
+        stmt = update(model).values(favorite_count=(
+            select(func.count(Favoritos.id)).where(fk == model.id).scalar_subquery()))
+        if todas:
+            db.session.execute(stmt)
+            continue
+        if ids is None:
+            continue
+        for trozo in chunked(ids):
+            db.session.execute(stmt.where(model.id.in_(trozo)))
+
+
+class TableVersion(db.Model):
+    # version de cada tabla, sube en cada commit que la modifica (la usan los ETag / Last-Modified)
+    __tablename__ = "table_version"
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+
+def table_versions(*names):
+    """Devuelve ({tabla: version}, ultima modificacion) de las tablas pedidas con una sola query."""
+    rows = db.session.execute(
+        select(TableVersion.name, TableVersion.version, TableVersion.updated_at)
+        .where(TableVersion.name.in_(names))).all()
+    versions = {name: 0 for name in names}
+    versions.update({row.name: row.version for row in rows})
+    last_modified = max((row.updated_at for row in rows), default=None)
+    return versions, last_modified
+
+
+def _tablas_modificadas(session):
+    return session.info.setdefault("tablas_modificadas", set())
+
+
+@event.listens_for(Session, "before_flush")
+def _anotar_flush(session, flush_context, instances):
+    for obj in chain(session.new, session.deleted, session.dirty):
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        table = getattr(obj, "__tablename__", None)
+        if table and table != TableVersion.__tablename__:
+            _tablas_modificadas(session).add(table)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _anotar_execute(orm_execute_state):
+    # INSERT/UPDATE/DELETE en bloque (session.execute(insert(...))) no pasan por el flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = orm_execute_state.statement.table.name
+        if table != TableVersion.__tablename__:
+            _tablas_modificadas(orm_execute_state.session).add(table)
+
+
+@event.listens_for(Session, "before_commit")
+def _subir_versiones(session):
+    session.flush()
+    tablas = session.info.pop("tablas_modificadas", None)
+    if not tablas:
+        return
+    ahora = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    for name in sorted(tablas):
+        result = session.execute(
+            update(TableVersion).where(TableVersion.name == name)
+            .values(version=TableVersion.version + 1, updated_at=ahora))
+        if result.rowcount == 0:
+            session.execute(insert(TableVersion).values(name=name, version=1, updated_at=ahora))
+
+
+@event.listens_for(Session, "after_rollback")
+def _olvidar_versiones(session):
+    session.info.pop("tablas_modificadas", None)
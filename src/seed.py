@@ -0,0 +1,125 @@
+import random
+import time
+from itertools import islice
+
+from sqlalchemy import delete, insert
+
+from models import db, User, Pokemon, Pokeballs, Favoritos, refresh_favorite_counts
+
+SILABAS = ("pi", "ka", "chu", "bul", "ba", "sa", "ur", "char", "man", "der", "squir", "tle",
+           "ee", "vee", "gen", "gar", "ono", "dra", "ti", "ni", "mew", "tu", "lap", "ras")
+
+
+def _nombre(rnd):
+    return "".join(rnd.choice(SILABAS) for _ in range(rnd.randint(2, 4))).capitalize()
+
+
+def _insertar(model, filas, chunk_size):
+    """INSERT ... RETURNING en trozos de chunk_size filas, con commit por trozo. Devuelve los ids."""
+    ids = []
+    filas = iter(filas)
+    while trozo := list(islice(filas, chunk_size)):
+        ids.extend(db.session.execute(insert(model).returning(model.id), trozo).scalars())
+        db.session.commit()
+    return sorted(ids)
+
+
+def _pesos_zipf(n, skew):
+    # pesos acumulados 1/rango^skew: el primero del ranking es el mas popular
+    total = 0.0
+    acumulados = []
+    for rango in range(1, n + 1):
+        total += 1.0 / rango ** skew
+        acumulados.append(total)
+    return acumulados
+
+
+def _reparto_usuarios(rnd, usuarios, total, alpha, maximo):
+    """Cuantos favoritos tiene cada usuario: Pareto, unos pocos usuarios acumulan muchos."""
+    total = min(total, usuarios * maximo)
+    pesos = [rnd.paretovariate(alpha) for _ in range(usuarios)]
+    escala = total / sum(pesos)
+    cuantos = [min(maximo, int(peso * escala)) for peso in pesos]
+    # lo que se pierde al redondear o al topar se reparte entre usuarios con hueco
+    faltan = total - sum(cuantos)
+    while faltan > 0:
+        i = rnd.randrange(usuarios)
+        if cuantos[i] < maximo:
+            cuantos[i] += 1
+            faltan -= 1
+    return cuantos
+
+
+def _elegir(rnd, ranking, acumulados, k):
+    """k ids distintos de ranking, elegidos segun su popularidad."""
+    if k >= len(ranking) // 2:
+        # si se lleva casi todo el catalogo no merece la pena sortear con pesos
+        return sorted(rnd.sample(ranking, k))
+    elegidos = set()
+    for _ in range(10):
+        elegidos.update(rnd.choices(ranking, cum_weights=acumulados, k=k - len(elegidos)))
+        if len(elegidos) >= k:
+            return sorted(elegidos)
+    restantes = [x for x in ranking if x not in elegidos]
+    elegidos.update(rnd.sample(restantes, k - len(elegidos)))
+    return sorted(elegidos)
+
+
+def _favoritos(rnd, user_ids, cuantos, pokemon, pokeballs, skew, pokeball_ratio):
+    # mismo tipo de reparto para pokemon y pokeballs, cada uno con su ranking de popularidad
+    pk_ranking, pb_ranking = pokemon[:], pokeballs[:]
+    rnd.shuffle(pk_ranking)
+    rnd.shuffle(pb_ranking)
+    pk_pesos = _pesos_zipf(len(pk_ranking), skew)
+    pb_pesos = _pesos_zipf(len(pb_ranking), skew)
+    for user_id, total in zip(user_ids, cuantos):
+        n_pb = min(len(pb_ranking), round(total * pokeball_ratio))
+        n_pk = min(len(pk_ranking), total - n_pb)
+        n_pb = min(len(pb_ranking), total - n_pk)
+        for pokemon_id in _elegir(rnd, pk_ranking, pk_pesos, n_pk):
+            yield {"user_id": user_id, "pokemon_id": pokemon_id, "pokeballs_id": None}
+        for pokeballs_id in _elegir(rnd, pb_ranking, pb_pesos, n_pb):
+            yield {"user_id": user_id, "pokemon_id": None, "pokeballs_id": pokeballs_id}
+
+
+def seed_database(users, pokemon, pokeballs, favoritos, seed=42, skew=1.1, power_users=1.5,
+                  pokeball_ratio=0.1, chunk_size=10000, reset=False, log=print):
+    """Genera datos sinteticos con inserts en bloque. Con la misma semilla (y --reset)
+    salen siempre los mismos datos. La popularidad de pokemon y pokeballs sigue una Zipf
+    de exponente skew y los favoritos por usuario una Pareto de parametro power_users
+    (cuanto mas bajo, mas se concentran en unos pocos usuarios)."""
+    rnd = random.Random(seed)
+    inicio = time.perf_counter()
+    if reset:
+        for model in (Favoritos, User, Pokemon, Pokeballs):
+            db.session.execute(delete(model))
+        db.session.commit()
+        log("tablas vaciadas")
+
+    # el prefijo con la semilla evita chocar con los campos unicos de otras semillas
+    prefijo = f"s{seed}-"
+    user_ids = _insertar(User, ({"name": f"{prefijo}user{i}"} for i in range(users)), chunk_size)
+    pokemon_ids = _insertar(Pokemon, (
+        {"name": _nombre(rnd), "url": f"https://pokeapi.co/p/{prefijo}{i}"}
+        for i in range(pokemon)), chunk_size)
+    pokeball_ids = _insertar(Pokeballs, (
+        {"nombre": f"{_nombre(rnd)} Ball", "efectividad": rnd.randint(1, 100),
+         "descripcion": f"{prefijo}pokeball {i}"}
+        for i in range(pokeballs)), chunk_size)
+    log(f"{users} usuarios, {pokemon} pokemon y {pokeballs} pokeballs ({time.perf_counter() - inicio:.1f}s)")
+
+    cuantos = _reparto_usuarios(rnd, users, favoritos, power_users, pokemon + pokeballs) if users else []
+    filas = _favoritos(rnd, user_ids, cuantos, pokemon_ids, pokeball_ids, skew, pokeball_ratio)
+    insertados = 0
+    while trozo := list(islice(filas, chunk_size)):
+        db.session.execute(insert(Favoritos.__table__), trozo)
+        db.session.commit()
+        insertados += len(trozo)
+        if insertados % (chunk_size * 50) < chunk_size:
+            log(f"  {insertados} favoritos ({time.perf_counter() - inicio:.1f}s)")
+
+    refresh_favorite_counts(pokemon_ids=pokemon_ids, pokeball_ids=pokeball_ids)
+    db.session.commit()
+    segundos = time.perf_counter() - inicio
+    log(f"{insertados} favoritos en {segundos:.1f}s ({insertados / segundos:.0f} filas/s)")
+    return insertados
@@ -1,4 +1,19 @@
-from flask import jsonify, url_for
+import base64
+import binascii
+import functools
+import hashlib
+import json
+from datetime import timezone
+from flask import Response, current_app, g, jsonify, make_response, request, stream_with_context, url_for
+from sqlalchemy import or_
+
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 1000
+STREAM_BATCH_SIZE = 500
+MAX_BATCH_IDS = 1000
+MAX_BULK_IDS = 10000
+# endpoints que no son para navegar (los lee Prometheus)
+SITEMAP_EXCLUDE = ("/metrics",)
 
 class APIException(Exception):
     status_code = 400
@@ -15,6 +30,230 @@ class APIException(Exception):
         rv['message'] = self.message
         return rv
 
+def encode_cursor(value):
+    # cursor opaco: el JSON de la clave del ultimo elemento (el id, o [valor, id]) en base64
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor, compound=False, value_type=object):
+    """El id del cursor o, con compound, [valor, id] donde valor es None o un escalar JSON
+    del tipo value_type (el python_type de la columna de orden; object si no se sabe)."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise APIException("Invalid cursor", status_code=400)
+    if compound:
+        valid = isinstance(value, list) and len(value) == 2 and type(value[1]) is int
+        valid = valid and valid_cursor_value(value[0], value_type)
+    else:
+        valid = type(value) is int
+    if not valid:
+        raise APIException("Invalid cursor", status_code=400)
+    return value
+
+def valid_cursor_value(value, value_type):
+    # un cursor manipulado ([{"x": 1}, 5], [[1], 5]...) llegaria tal cual al driver
+    if value is None:
+        return True
+    if type(value) not in (str, int, float):
+        return False
+    if value_type is float:
+        return type(value) in (int, float)
+    return value_type is object or type(value) is value_type
+
+def parse_limit(value):
+    if value is None:
+        return DEFAULT_PAGE_LIMIT
+    try:
+        limit = int(value)
+    except ValueError:
+        raise APIException("limit must be an integer", status_code=400)
+    if limit < 1:
+        raise APIException("limit must be greater than 0", status_code=400)
+    return min(limit, MAX_PAGE_LIMIT)
+
+def parse_ids(req, limit=MAX_BATCH_IDS):
+    """Ids de una operacion por lotes: ?ids=1,2,3 en un GET o un body JSON {"ids": [1, 2, 3]}
+    (o directamente la lista). Quita los repetidos manteniendo el orden."""
+    if req.method != "GET":
+        data = req.get_json(silent=True)
+        raw = data.get("ids") if isinstance(data, dict) else data
+        if not isinstance(raw, list):
+            raise APIException('body must be a list of ids or {"ids": [...]}', status_code=400)
+        # en JSON solo valen enteros: int() convertiria 1.7, true o "2" en otro id
+        if not all(type(value) is int for value in raw):
+            raise APIException("ids must be integers", status_code=400)
+        ids = list(dict.fromkeys(raw))
+    else:
+        try:
+            ids = list(dict.fromkeys(
+                int(part) for part in req.args.get("ids", "").split(",") if part.strip()))
+        except ValueError:
+            raise APIException("ids must be integers", status_code=400)
+    if not ids:
+        raise APIException("ids is required", status_code=400)
+    if len(ids) > limit:
+        raise APIException(f"at most {limit} ids per request", status_code=400)
+    return ids
+
+def wants_pagination(args):
+    return "limit" in args or "after" in args
+
+def parse_fields(args, name, allowed):
+    """?fields=a,b o ?expand=a: conjunto de nombres pedidos (todos de allowed), o None si no viene."""
+    value = args.get(name)
+    if value is None:
+        return None
+    fields = {field.strip() for field in value.split(",") if field.strip()}
+    # ?fields= vacio devolveria objetos vacios: tambien es un error
+    if not fields or fields - set(allowed):
+        raise APIException(f"{name} must be a comma-separated list of: {', '.join(allowed)}", status_code=400)
+    return fields
+
+def parse_sort(args, columns):
+    """?sort=campo o ?sort=-campo (descendente) entre las columnas permitidas.
+    Devuelve (columna, descendente), o None para el orden por defecto (id ascendente)."""
+    sort = args.get("sort")
+    if not sort or sort == "id":
+        return None
+    descending = sort.startswith("-")
+    column = columns.get(sort.lstrip("-"))
+    if column is None:
+        raise APIException(f"sort must be one of: {', '.join(columns)} (prefix - for descending)", status_code=400)
+    return column, descending
+
+def sort_order(sort, key_column):
+    # la clave primaria desempata para que el orden sea estable (y el cursor valga)
+    if sort is None:
+        return (key_column,)
+    column, descending = sort
+    return (column.desc(), key_column.desc()) if descending else (column, key_column)
+
+def keyset_paginate(session, stmt, key_column, args, serializer, sort=None, rows=False):
+    """Pagina por rango sobre la clave primaria (WHERE id > cursor ORDER BY id LIMIT n)
+    en vez de OFFSET, asi cada pagina cuesta lo mismo sin importar la posicion.
+    Con sort (de parse_sort) ordena por (columna, id) y el cursor guarda los dos valores.
+    Con rows=True stmt es un select de columnas y serializer recibe las filas."""
+    limit = parse_limit(args.get("limit"))
+    after = args.get("after")
+    if sort is None:
+        if after:
+            stmt = stmt.where(key_column > decode_cursor(after))
+        # pedimos uno de mas para saber si hay pagina siguiente
+        result = session.execute(stmt.order_by(key_column).limit(limit + 1))
+        items = result.all() if rows else result.scalars().all()
+        keys = [getattr(item, key_column.key) for item in items]
+    else:
+        column, descending = sort
+        if after:
+            value, last_key = decode_cursor(after, compound=True, value_type=column.type.python_type)
+            # (columna, id) > (valor, ultimo id), escrito asi para que el indice de la
+            # columna acote el rango (con row values SQLite recorre el indice desde el principio)
+            if descending:
+                stmt = stmt.where(column <= value, or_(column < value, key_column < last_key))
+            else:
+                stmt = stmt.where(column >= value, or_(column > value, key_column > last_key))
+        result = session.execute(
+            stmt.add_columns(column.label("sort_key")).order_by(*sort_order(sort, key_column)).limit(limit + 1)).all()
+        items = result if rows else [row[0] for row in result]
+        keys = [[row.sort_key, getattr(item, key_column.key)] for row, item in zip(result, items)]
+    has_more = len(items) > limit
+    items = items[:limit]
+    next_cursor = encode_cursor(keys[limit - 1]) if has_more else None
+    return {
+        "results": [serializer(item) for item in items],
+        "next": next_cursor
+    }
+
+def stream_format(args):
+    # ?stream=json (array JSON) o ?stream=ndjson (un objeto por linea); None si no se pide
+    fmt = args.get("stream")
+    if fmt is None:
+        return None
+    if fmt not in ("json", "ndjson"):
+        raise APIException("stream must be json or ndjson", status_code=400)
+    return fmt
+
+def stream_rows(session, stmt, serializer, fmt, batch_size=STREAM_BATCH_SIZE, rows=False):
+    """Devuelve una respuesta que va leyendo la query con un cursor del servidor
+    (yield_per) y escribiendo el JSON por lotes, asi la memoria depende del lote
+    y no del tamano de la tabla. rows=True como en keyset_paginate."""
+    dumps = current_app.json.dumps
+
+    def generate():
+        result = session.execute(stmt.execution_options(yield_per=batch_size))
+        if not rows:
+            result = result.scalars()
+        if fmt == "ndjson":
+            for batch in result.partitions():
+                yield "".join(dumps(serializer(row)) + "\n" for row in batch)
+            return
+        yield "["
+        first = True
+        for batch in result.partitions():
+            chunk = ",".join(dumps(serializer(row)) for row in batch)
+            yield chunk if first else "," + chunk
+            first = False
+        yield "]"
+
+    mimetype = "application/x-ndjson" if fmt == "ndjson" else "application/json"
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
+def conditional_get(load_versions):
+    """Decorador para GET: con las versiones de las tablas que lee el endpoint (y la
+    query string) calcula un ETag fuerte, y si el cliente ya tiene esa version
+    (If-None-Match / If-Modified-Since) responde 304 sin consultar ni serializar filas.
+    load_versions() devuelve (versiones, datetime UTC de la ultima modificacion o None)."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            versions, last_modified = load_versions()
+            # la vista las usa para que la cache de su proceso no devuelva un cuerpo de
+            # otra version con este ETag (table_version_stamp)
+            g.table_versions = versions
+            raw = f"{request.path}?{request.query_string.decode()}|{sorted(versions.items())}"
+            etag = hashlib.sha1(raw.encode()).hexdigest()
+            if last_modified is not None:
+                last_modified = last_modified.replace(tzinfo=timezone.utc)
+
+            matched = None
+            if request.if_none_match:
+                # setup_compression anade -gzip / -deflate al ETag de las respuestas comprimidas;
+                # el 304 devuelve el que tiene el cliente para que su copia siga valiendo
+                matched = next((tag for tag in (etag, f"{etag}-gzip", f"{etag}-deflate")
+                                if request.if_none_match.contains(tag)), None)
+                not_modified = matched is not None
+            else:
+                since = request.if_modified_since
+                not_modified = since is not None and last_modified is not None and last_modified <= since
+            if not_modified:
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(matched or etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            return response
+        return wrapper
+    return decorator
+
+def version_stamp(versions):
+    # {tabla: version} como stamp de la cache (tambien lo usa asgi.py)
+    return ",".join(f"{name}:{version}" for name, version in sorted(versions.items()))
+
+def table_version_stamp():
+    """Las versiones de tablas que leyo conditional_get, para usarlas como stamp de la cache:
+    una escritura en otro worker sube la version y la entrada vieja de este proceso deja de usarse."""
+    return version_stamp(g.table_versions)
+
+def chunked(items, size=5000):
+    # parte listas grandes para no pasarse del limite de parametros por query (IN)
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
 def has_no_empty_params(rule):
     defaults = rule.defaults if rule.defaults is not None else ()
     arguments = rule.arguments if rule.arguments is not None else ()
@@ -27,7 +266,7 @@ def generate_sitemap(app):
         # and rules that require parameters
         if "GET" in rule.methods and has_no_empty_params(rule):
             url = url_for(rule.endpoint, **(rule.defaults or {}))
-            if "/admin/" not in url:
+            if "/admin/" not in url and url not in SITEMAP_EXCLUDE:
                 links.append(url)
 
     links_html = "".join(["<li><a href='" + y + "'>" + y + "</a></li>" for y in links])
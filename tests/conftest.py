@@ -0,0 +1,50 @@
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+import pytest
+
+# la app lee DATABASE_URL al importarse: una base de datos SQLite temporal para los tests
+DB_PATH = os.path.join(tempfile.mkdtemp(), "test.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ["CACHE_BACKEND"] = "memory"
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sqlalchemy import event  # noqa: E402
+
+from app import app as flask_app, catalog_cache  # noqa: E402
+from models import db  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    with flask_app.app_context():
+        db.create_all()
+        catalog_cache.clear()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def queries(app):
+    """Sentencias SQL lanzadas dentro del bloque: with queries() as sentencias: ..."""
+    @contextmanager
+    def capturar():
+        sentencias = []
+
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            sentencias.append(statement)
+
+        event.listen(db.engine, "after_cursor_execute", after_cursor_execute)
+        try:
+            yield sentencias
+        finally:
+            event.remove(db.engine, "after_cursor_execute", after_cursor_execute)
+    return capturar
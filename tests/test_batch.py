@@ -0,0 +1,28 @@
+import pytest
+
+from models import db, Pokemon
+
+
+@pytest.fixture
+def pokemon(app):
+    db.session.add_all([Pokemon(name="Pikachu", url="p1"), Pokemon(name="Bulbasaur", url="p2")])
+    db.session.commit()
+
+
+def test_batch_by_query_string_and_body(client, pokemon):
+    por_query = client.get("/pokemon/batch?ids=2, 1,3,2").get_json()
+    por_body = client.post("/pokemon/batch", json={"ids": [2, 1, 3, 2]}).get_json()
+    assert por_query == por_body
+    assert por_body["results"]["1"]["name"] == "Pikachu" and por_body["results"]["3"] is None
+    assert por_body["not_found"] == [3]
+
+
+@pytest.mark.parametrize("ids", [[1.7], [1.0], [True], ["2"], [1, None]])
+def test_batch_body_rejects_non_integer_ids(client, pokemon, ids):
+    response = client.post("/pokemon/batch", json={"ids": ids})
+    assert response.status_code == 400
+    assert response.get_json()["message"] == "ids must be integers"
+
+
+def test_batch_query_string_rejects_non_integer_ids(client, pokemon):
+    assert client.get("/pokemon/batch?ids=1,dos").status_code == 400
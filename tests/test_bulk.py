@@ -0,0 +1,32 @@
+import pytest
+from sqlalchemy import func, select
+
+from models import db, User, Pokemon, Favoritos
+
+
+@pytest.fixture
+def datos(app):
+    user = User(name="ash")
+    pokemon = [Pokemon(name=f"Pika{i}", url=f"p{i}") for i in range(3)]
+    db.session.add_all([user] + pokemon)
+    db.session.add_all(Favoritos(usuario=user, pokemon=p) for p in pokemon)
+    db.session.commit()
+
+
+def contar(model):
+    return db.session.execute(select(func.count()).select_from(model)).scalar()
+
+
+@pytest.mark.parametrize("ids", [[1.9], [1, "2"], [True]])
+def test_bulk_writes_reject_non_integer_ids_and_change_nothing(client, datos, ids):
+    assert client.delete("/pokemon/bulk", json={"ids": ids}).status_code == 400
+    assert client.delete("/favoritos/bulk", json={"ids": ids}).status_code == 400
+    assert client.put("/pokemon/bulk", json={"ids": ids, "name": "Renombrado"}).status_code == 400
+    assert contar(Pokemon) == 3 and contar(Favoritos) == 3
+    assert "Renombrado" not in db.session.execute(select(Pokemon.name)).scalars().all()
+
+
+def test_bulk_delete_pokemon_removes_rows_and_their_favoritos(client, datos):
+    response = client.delete("/pokemon/bulk", json={"ids": [1, 2, 99]})
+    assert response.get_json() == {"deleted": 2, "favoritos_deleted": 2}
+    assert contar(Pokemon) == 1 and contar(Favoritos) == 1
@@ -0,0 +1,20 @@
+from cache import LRUCache
+
+
+def test_lru_versions_are_bounded():
+    cache = LRUCache(maxsize=8)
+    # como un DELETE /pokemon/bulk con 10k ids
+    cache.invalidate(*(f"pokemon:{id}" for id in range(10000)))
+    assert len(cache._versions) <= 8
+
+
+def test_lru_invalidated_values_do_not_come_back_after_their_version_is_dropped():
+    cache = LRUCache(maxsize=4)
+    for id in range(20):
+        assert cache.get_or_set(f"pokemon:{id}", lambda: "viejo") == "viejo"
+        cache.invalidate(f"pokemon:{id}")
+    # las primeras claves ya no estan en _versions, pero su valor viejo sigue sin servirse
+    assert "pokemon:0" not in cache._versions
+    for id in range(20):
+        assert cache.get_or_set(f"pokemon:{id}", lambda: "nuevo") == "nuevo"
+        assert cache.get_or_set(f"pokemon:{id}", lambda: "otro") == "nuevo"
@@ -0,0 +1,84 @@
+import base64
+import json
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
+from models import db, Pokemon, Pokeballs
+
+
+@pytest.fixture
+def pokemon(app):
+    db.session.add_all(Pokemon(name=f"Pika{i:03d}", url=f"p{i}") for i in range(300))
+    db.session.commit()
+
+
+def plan_de(client, path):
+    """EXPLAIN QUERY PLAN de la SELECT sobre pokemon que lanza GET path."""
+    lanzadas = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        lanzadas.append((statement, parameters))
+
+    event.listen(db.engine, "after_cursor_execute", capturar)
+    try:
+        assert client.get(path).status_code == 200
+    finally:
+        event.remove(db.engine, "after_cursor_execute", capturar)
+    statement, parameters = next((s, p) for s, p in lanzadas if "FROM pokemon" in s)
+    filas = db.session.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)
+    return " | ".join(fila[3] for fila in filas)
+
+
+def cursor(valor):
+    return base64.urlsafe_b64encode(json.dumps(valor).encode()).decode().rstrip("=")
+
+
+# ?q= solo tiene indice en Postgres (trigramas); en SQLite recorre la tabla
+@pytest.mark.parametrize("path", ["/pokemon?name=pika010", "/pokemon?name_prefix=PIKA01"])
+def test_name_filters_use_the_normalized_name_index(client, pokemon, path):
+    assert "SEARCH pokemon USING INDEX ix_pokemon_name_normalizado" in plan_de(client, path)
+
+
+@pytest.mark.parametrize("path", [
+    "/pokemon?sort=name&limit=20",
+    f"/pokemon?sort=name&limit=20&after={cursor(['pika100', 101])}",
+    "/pokemon?name_prefix=pika1&sort=-name&limit=20",
+])
+def test_sort_by_name_reads_the_index_in_order(client, pokemon, path):
+    plan = plan_de(client, path)
+    assert "USING INDEX ix_pokemon_name_normalizado" in plan, plan
+    assert "TEMP B-TREE" not in plan, plan
+
+
+@pytest.mark.parametrize("valor", [[{"x": 1}, 5], [[1], 5], [True, 5], [7, 5], ["pika", "5"], ["pika"]])
+def test_tampered_sort_cursor_is_rejected(client, pokemon, valor):
+    response = client.get(f"/pokemon?sort=name&limit=5&after={cursor(valor)}")
+    assert response.status_code == 400
+    assert response.get_json()["message"] == "Invalid cursor"
+
+
+def test_sort_cursor_pages_through_all_rows(client, pokemon):
+    vistos, path = [], "/pokemon?sort=-name&limit=64"
+    while path:
+        pagina = client.get(path).get_json()
+        vistos += [fila["name"] for fila in pagina["results"]]
+        path = pagina["next"] and f"/pokemon?sort=-name&limit=64&after={pagina['next']}"
+    assert vistos == sorted(vistos, reverse=True) and len(vistos) == 300
+
+
+def test_name_prefix_matches_punctuation_and_non_ascii(client):
+    nombres = ["pika", "pika-chu", "pika chu", "pika~", "pikañ", "pika\U0001f600", "pikb", "pik", "apika"]
+    db.session.add_all(Pokemon(name=name, url=f"u{i}") for i, name in enumerate(nombres))
+    db.session.commit()
+    encontrados = {fila["name"] for fila in client.get("/pokemon?name_prefix=Pika").get_json()}
+    assert encontrados == set(nombres[:6])
+
+
+@pytest.mark.parametrize("tabla", [Pokemon.__table__, Pokeballs.__table__])
+def test_normalized_names_use_c_collation_on_postgres(tabla):
+    # el rango de ?name_prefix= y el orden de ?sort=name solo valen con orden por codigo
+    ddl = str(CreateTable(tabla).compile(dialect=postgresql.dialect()))
+    assert 'normalizado VARCHAR(100) COLLATE "C" NOT NULL' in ddl
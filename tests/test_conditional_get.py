@@ -0,0 +1,83 @@
+import pytest
+
+import app as app_module
+from cache import LRUCache, SQLiteCache
+from models import db, Pokemon, Pokeballs
+
+
+def crear_pokemon(n):
+    db.session.add_all(Pokemon(name=f"Pika{i}", url=f"p{i}") for i in range(n))
+    db.session.commit()
+
+
+def test_worker_cache_does_not_serve_stale_list_under_new_etag(client, monkeypatch):
+    # dos workers con su cache en memoria sobre la misma base de datos
+    worker_a, worker_b = LRUCache(), LRUCache()
+    crear_pokemon(1)
+    monkeypatch.setattr(app_module, "catalog_cache", worker_a)
+    antes = client.get("/pokemon")
+    assert antes.get_json()[0]["name"] == "Pika0"
+
+    # el PUT lo atiende el worker B: solo invalida su propia cache
+    monkeypatch.setattr(app_module, "catalog_cache", worker_b)
+    assert client.put("/pokemonput/1", json={"name": "Pikachu"}).status_code == 200
+
+    monkeypatch.setattr(app_module, "catalog_cache", worker_a)
+    despues = client.get("/pokemon")
+    assert despues.headers["ETag"] != antes.headers["ETag"]
+    assert despues.get_json()[0]["name"] == "Pikachu"
+    assert client.get("/pokemon", headers={"If-None-Match": despues.headers["ETag"]}).status_code == 304
+
+
+def dos_workers(backend, tmp_path):
+    # con sqlite los dos workers comparten el fichero; con memory cada uno tiene la suya
+    if backend == "sqlite":
+        path = str(tmp_path / "cache.sqlite")
+        return SQLiteCache(path), SQLiteCache(path)
+    return LRUCache(), LRUCache()
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+@pytest.mark.parametrize("lectura, escritura, cuerpo", [
+    ("/pokemon/1", ("/pokemonput/1", {"name": "Pikachu"}), lambda data: data["name"]),
+    ("/pokemon", ("/pokemonput/1", {"name": "Pikachu"}), lambda data: data[0]["name"]),
+    ("/pokeball/1", ("/pokeball/bulk", {"ids": [1]}), lambda data: data.get("error")),
+])
+def test_worker_cache_sees_writes_from_other_workers(client, monkeypatch, tmp_path, backend, lectura, escritura, cuerpo):
+    worker_a, worker_b = dos_workers(backend, tmp_path)
+    crear_pokemon(1)
+    db.session.add(Pokeballs(nombre="Poke Ball", efectividad=10, descripcion="basica"))
+    db.session.commit()
+    monkeypatch.setattr(app_module, "catalog_cache", worker_a)
+    antes = cuerpo(client.get(lectura).get_json())
+
+    monkeypatch.setattr(app_module, "catalog_cache", worker_b)
+    path, body = escritura
+    metodo = client.delete if path.endswith("/bulk") else client.put
+    assert metodo(path, json=body).status_code == 200
+
+    monkeypatch.setattr(app_module, "catalog_cache", worker_a)
+    despues = cuerpo(client.get(lectura).get_json())
+    assert despues != antes
+
+
+def test_sqlite_cache_invalidation_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    worker_a, worker_b = SQLiteCache(path), SQLiteCache(path)
+    assert worker_a.get_or_set("pokemon:1", lambda: {"name": "Pika"}) == {"name": "Pika"}
+    assert worker_b.get_or_set("pokemon:1", lambda: {"name": "otro"}) == {"name": "Pika"}
+    worker_b.invalidate("pokemon:1")
+    assert worker_a.get_version("pokemon:1") == 1
+    assert worker_a.get_or_set("pokemon:1", lambda: {"name": "Pikachu"}) == {"name": "Pikachu"}
+
+
+def test_not_modified_echoes_the_compressed_etag(client):
+    crear_pokemon(100)
+    response = client.get("/pokemon", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    etag = response.headers["ETag"]
+    assert etag.endswith('-gzip"')
+
+    revalidada = client.get("/pokemon", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert revalidada.status_code == 304
+    assert revalidada.headers["ETag"] == etag
@@ -0,0 +1,63 @@
+import sqlite3
+
+from sqlalchemy import insert, select
+
+from conftest import DB_PATH
+from models import db, User, Pokemon, Pokeballs
+
+
+def test_createusers_recounts_only_referenced_pokemon(client, queries):
+    db.session.add_all([Pokemon(name="Pikachu", url="p1"), Pokemon(name="Bulbasaur", url="p2"),
+                        Pokeballs(nombre="Poke Ball", efectividad=10, descripcion="basica")])
+    db.session.commit()
+    with queries() as sentencias:
+        response = client.post("/createusers", json=[{"name": "ash", "favoritos": [1]},
+                                                     {"name": "misty", "favoritos": [1]}])
+    assert response.status_code == 201
+    # solo se recalcula el pokemon 1, ni el resto de pokemon ni las pokeballs
+    recuentos = [s for s in sentencias if s.startswith("UPDATE pokemon") or s.startswith("UPDATE pokeballs")]
+    assert len(recuentos) == 1 and "WHERE pokemon.id IN" in recuentos[0]
+    assert db.session.execute(select(Pokemon.favorite_count).order_by(Pokemon.id)).scalars().all() == [2, 0]
+
+
+def test_duplicate_favorite_names_are_normalized_like_python(client):
+    db.session.add(User(name="ash"))
+    db.session.commit()
+    assert client.post("/favorito/pokemon/1", json={"name": "Ñandú", "url": "n1"}).status_code == 201
+    # lower() y trim() de SQLite solo entienden ASCII y espacios: se normaliza en Python
+    for name in ("ñandú", "\tÑANDÚ\n", "  ñandú "):
+        response = client.post("/favorito/pokemon/1", json={"name": name, "url": f"n-{name!r}"})
+        assert response.status_code == 409, name
+    assert client.post("/favorito/pokemon/1", json={"name": "ñandu", "url": "n2"}).status_code == 201
+
+    pokeball = {"efectividad": 90, "descripcion": "rapida"}
+    assert client.post("/favorito/pokeballs/1", json=dict(pokeball, nombre="Élite Ball")).status_code == 201
+    response = client.post("/favorito/pokeballs/1", json=dict(pokeball, nombre="élite ball\n", descripcion="otra"))
+    assert response.status_code == 409
+
+
+def test_normalized_names_are_stored_on_every_write_path(client):
+    db.session.add(User(name="ash"))
+    db.session.commit()
+    assert client.post("/favorito/pokemon/1", json={"name": "\tPika\n", "url": "p1"}).status_code == 201
+    db.session.execute(insert(Pokemon), [{"name": " Ñandú ", "url": "p2"}])
+    db.session.commit()
+    assert client.put("/pokemonput/2", json={"name": "Ñandú Real"}).status_code == 200
+    db.session.execute(insert(Pokemon), [{"name": "Mew", "url": "p3"}])
+    db.session.commit()
+    assert client.put("/pokemon/bulk", json={"ids": [3], "name": " MEWTWO"}).status_code == 200
+    normalizados = db.session.execute(select(Pokemon.name_normalizado).order_by(Pokemon.id)).scalars().all()
+    assert normalizados == ["pika", "ñandú real", "mewtwo"]
+    # Postgres trim() solo quita espacios: la comparacion no puede depender de la base de datos
+    response = client.post("/favorito/pokemon/1", json={"name": "PIKA", "url": "p4"})
+    assert response.status_code == 409
+
+
+def test_database_file_stays_consistent_outside_the_app(client):
+    db.session.add(User(name="ash"))
+    db.session.commit()
+    for name, url in (("Ñandú", "n1"), ("\tPika", "n2")):
+        assert client.post("/favorito/pokemon/1", json={"name": name, "url": url}).status_code == 201
+    # una conexion de sqlite3 sin nada de la app (otra herramienta, alembic, la CLI)
+    with sqlite3.connect(DB_PATH) as conn:
+        assert conn.execute("PRAGMA integrity_check").fetchall() == [("ok",)]
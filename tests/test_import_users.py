@@ -0,0 +1,97 @@
+import json
+from contextlib import contextmanager
+
+from sqlalchemy import event, select
+
+import app as modulo_app
+from models import db, User, Pokemon
+
+
+def ndjson(*lineas):
+    return "\n".join(linea if isinstance(linea, str) else json.dumps(linea) for linea in lineas) + "\n"
+
+
+def importar(client, body, chunk_size):
+    return client.post(f"/importusers?chunk_size={chunk_size}", data=body, content_type="application/x-ndjson")
+
+
+@contextmanager
+def contar_commits():
+    commits = []
+
+    def commit(conn):
+        commits.append(conn)
+
+    event.listen(db.engine, "commit", commit)
+    try:
+        yield commits
+    finally:
+        event.remove(db.engine, "commit", commit)
+
+
+def nombres():
+    return db.session.execute(select(User.name).order_by(User.id)).scalars().all()
+
+
+def test_import_commits_once_per_chunk(client):
+    db.session.add(Pokemon(name="Pikachu", url="p1"))
+    db.session.commit()
+    body = ndjson(*({"name": f"user{i}", "favoritos": [1]} for i in range(5)))
+    with contar_commits() as commits:
+        response = importar(client, body, chunk_size=2)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["insertados"] == 5
+    assert [trozo["lineas"] for trozo in data["trozos"]] == [[1, 2], [3, 4], [5, 5]]
+    assert len(commits) == 3
+    assert db.session.execute(select(Pokemon.favorite_count)).scalar() == 5
+
+
+def test_import_reports_errors_per_line(client):
+    db.session.add_all([Pokemon(name="Pikachu", url="p1"), User(name="ash")])
+    db.session.commit()
+    body = ndjson(
+        {"name": "misty", "favoritos": [1]},
+        "{not json",
+        "",
+        {"name": "misty", "favoritos": [1]},
+        {"name": "brock", "favoritos": [99]},
+        {"name": "ash", "favoritos": [1]},
+        {"name": "gary", "favoritos": [1]},
+    )
+    response = importar(client, body, chunk_size=10)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["insertados"] == 2
+    # las lineas vacias no cuentan como error pero si para la numeracion
+    errores = {error["linea"]: error["error"] for error in data["trozos"][0]["errores"]}
+    assert errores == {
+        2: "Invalid JSON",
+        4: "User misty already exists",
+        5: "Pokemon not found: [99]",
+        6: "User ash already exists",
+    }
+    assert nombres() == ["ash", "misty", "gary"]
+
+
+def test_import_integrity_error_rolls_back_only_its_chunk(client, monkeypatch):
+    db.session.add_all([Pokemon(name="Pikachu", url="p1"), User(name="misty")])
+    db.session.commit()
+    # como si otro proceso hubiera insertado "misty" despues de validar el trozo
+    monkeypatch.setattr(modulo_app, "validar_lote_usuarios", lambda items: {})
+    body = ndjson(
+        {"name": "ash", "favoritos": [1]},
+        {"name": "misty", "favoritos": [1]},
+        {"name": "brock", "favoritos": [1]},
+    )
+    response = importar(client, body, chunk_size=2)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["insertados"] == 1
+    primero, segundo = data["trozos"]
+    assert primero["insertados"] == 0
+    assert primero["errores"] == [{"linea": 1, "error": "Conflict while inserting this chunk"},
+                                  {"linea": 2, "error": "Conflict while inserting this chunk"}]
+    assert segundo == {"lineas": [3, 3], "insertados": 1, "errores": []}
+    assert nombres() == ["misty", "brock"]
+    assert db.session.execute(select(Pokemon.favorite_count)).scalar() == 1
@@ -0,0 +1,28 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from models import db, Pokemon
+
+
+def test_streamed_responses_count_queries_run_while_streaming(client, queries):
+    db.session.add_all(Pokemon(name=f"Pika{i}", url=f"p{i}") for i in range(1200))
+    db.session.commit()
+    # las estadisticas de /db/stats son de todo el proceso
+    antes = client.get("/db/stats").get_json().get("get_pokemon", {"requests": 0, "queries": 0})
+    with queries() as sentencias:
+        response = client.get("/pokemon?stream=ndjson")
+        assert len(response.get_data().splitlines()) == 1200
+        response.close()
+    # la cabecera sale antes que el cuerpo: no puede llevar el total
+    assert "Server-Timing" not in response.headers
+    despues = client.get("/db/stats").get_json()["get_pokemon"]
+    assert despues["requests"] - antes["requests"] == 1
+    assert despues["queries"] - antes["queries"] == len(sentencias) >= 2
+
+
+def test_failed_statement_does_not_leak_query_start(app):
+    with db.engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM no_existe"))
+        assert conn.info["query_start"] == []
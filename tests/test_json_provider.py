@@ -0,0 +1,17 @@
+import json
+
+import pytest
+
+from json_provider import FastJSONProvider, orjson
+
+
+@pytest.mark.skipif(orjson is None, reason="orjson no esta instalado")
+def test_orjson_and_stdlib_encode_the_same_json(app, monkeypatch):
+    datos = [{"id": 1, "name": "Ñandú", "url": None}]
+    monkeypatch.setenv("JSON_ENCODER", "stdlib")
+    stdlib = FastJSONProvider(app).response(datos).get_data()
+    monkeypatch.setenv("JSON_ENCODER", "orjson")
+    rapido = FastJSONProvider(app).response(datos).get_data()
+    # mismo JSON, pero orjson deja el texto en UTF-8 y Flask lo escapa a \uXXXX
+    assert json.loads(rapido) == json.loads(stdlib)
+    assert "Ñandú".encode() in rapido and b"\\u00d1and\\u00fa" in stdlib
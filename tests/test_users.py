@@ -0,0 +1,40 @@
+from models import db, User, Pokemon, Pokeballs, Favoritos
+
+
+def crear_usuarios(prefijo, usuarios, favoritos_por_usuario):
+    pokemon = [Pokemon(name=f"{prefijo}poke{i}", url=f"{prefijo}{i}") for i in range(favoritos_por_usuario)]
+    pokeball = Pokeballs(nombre="Ultra Ball", efectividad=80, descripcion=f"{prefijo}ultra")
+    db.session.add_all(pokemon + [pokeball])
+    for i in range(usuarios):
+        user = User(name=f"{prefijo}user{i}")
+        db.session.add(user)
+        db.session.add_all(Favoritos(usuario=user, pokemon=p) for p in pokemon)
+        db.session.add(Favoritos(usuario=user, pokeballs=pokeball))
+    db.session.commit()
+
+
+def test_users_query_count_does_not_grow_with_favoritos(client, queries):
+    # con N+1 cada usuario y cada favorito lanzarian su propia query
+    crear_usuarios("a", usuarios=1, favoritos_por_usuario=1)
+    with queries() as pocos:
+        assert client.get("/users").status_code == 200
+
+    crear_usuarios("b", usuarios=20, favoritos_por_usuario=10)
+    with queries() as muchos:
+        response = client.get("/users")
+    assert response.status_code == 200
+    assert len(response.get_json()) == 21
+    assert len(muchos) == len(pocos)
+
+
+def test_users_fields_projection(client):
+    crear_usuarios("c", usuarios=2, favoritos_por_usuario=1)
+    response = client.get("/users?fields=nombre")
+    assert response.status_code == 200
+    assert response.get_json() == [{"nombre": "cuser0"}, {"nombre": "cuser1"}]
+
+
+def test_users_empty_fields_is_400(client):
+    crear_usuarios("d", usuarios=1, favoritos_por_usuario=1)
+    for query in ("fields=", "fields=,", "expand="):
+        assert client.get(f"/users?{query}").status_code == 400